@@ -11,12 +11,8 @@ if [ -f .env ]; then
   export $(grep -v '^#' .env | xargs)
 fi
 
-touch /var/log/regular_script.log
-chmod 666 /var/log/regular_script.log
+touch /var/log/adim_scheduler.log
+chmod 666 /var/log/adim_scheduler.log
 
-# Create cron job file 
-echo "0 23 * * * root /usr/local/bin/python3 /app/regular_script.py >> /var/log/regular_script.log 2>&1" > /etc/cron.d/regular_script_job
-chmod 0644 /etc/cron.d/regular_script_job
-
-# Start cron in foreground
-cron -f
+# Start the scheduler daemon in the foreground. It refreshes the schedules from the API and creates the indexes on time.
+exec /usr/local/bin/python3 -u /app/scheduler_daemon.py >> /var/log/adim_scheduler.log 2>&1
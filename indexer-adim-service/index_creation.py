@@ -1,40 +1,40 @@
-import os
 import sys
-import requests
-from dotenv import load_dotenv
-from schemas import LoginRequest, LoginResponse, CreateIndexRequest
+from typing import List
+from indexer_api_client import get_client
+from schemas import CreateIndexRequest, BulkCreateIndexRequest, BulkCreateIndexResponse
 
-load_dotenv()
 
-END_POINT = os.getenv("END_POINT")
-USER_NAME = os.getenv("USER_NAME")
-PASSWORD = os.getenv("PASSWORD")
-
-
-
-def get_access_token() -> str:
-    response = requests.post(
-        f"{END_POINT}/dba/login",
-        json=LoginRequest(username=USER_NAME, password=PASSWORD).model_dump()
+def create_index(tc_query_id: int):
+    response = get_client().post(
+        "/adim/create_index",
+        json=CreateIndexRequest(tc_query_id=tc_query_id).model_dump()
     )
     response.raise_for_status()
-    return LoginResponse(**response.json()).access_token
+    print(f"Index creation triggered for query ID {tc_query_id}")
 
 
-def create_index(tc_query_id: int):
-    access_token = get_access_token()
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(
-        f"{END_POINT}/adim/create_index",
-        json=CreateIndexRequest(tc_query_id=tc_query_id).model_dump(),
-        headers=headers
+def create_indexes(tc_query_ids: List[int]) -> BulkCreateIndexResponse:
+    """Create the indexes of several queries in one request, statements shared between them are built once."""
+    response = get_client().post(
+        "/adim/create_indexes",
+        json=BulkCreateIndexRequest(tc_query_ids=tc_query_ids).model_dump()
     )
     response.raise_for_status()
-    print(f"Index creation triggered for query ID {tc_query_id}")
+    result = BulkCreateIndexResponse(**response.json())
+    for query_result in result.results:
+        if query_result.success:
+            print(f"Indexes created for query ID {query_result.tc_query_id} in {query_result.duration_seconds:.1f} s")
+        else:
+            print(f"Index creation failed for query ID {query_result.tc_query_id}: {query_result.detail}")
+    return result
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("tc_query_id argument is missing")
         sys.exit(1)
-    create_index(int(sys.argv[1]))
+    tc_query_ids = [int(argument) for argument in sys.argv[1:]]
+    if len(tc_query_ids) == 1:
+        create_index(tc_query_ids[0])
+    else:
+        create_indexes(tc_query_ids)
@@ -0,0 +1,170 @@
+import os
+import json
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+from dotenv import load_dotenv
+from schemas import ADIMScheduleResponse
+from indexer_api_client import get_client
+from index_creation import create_indexes
+
+load_dotenv()
+
+# File the queue is persisted to, so the schedules survive a restart
+QUEUE_FILE = os.getenv("QUEUE_FILE", "/var/lib/adim/schedule_queue.json")
+# Seconds between two refreshes of the schedules from the API
+REFRESH_INTERVAL_SECONDS = int(os.getenv("REFRESH_INTERVAL_SECONDS", "300"))
+# Schedules missed by at most this many seconds (e.g. while the service was down) still fire, older ones are dropped
+MISSED_GRACE_SECONDS = int(os.getenv("MISSED_GRACE_SECONDS", "3600"))
+# Schedules due within this many seconds of each other are fired together with one bulk request
+BATCH_WINDOW_SECONDS = int(os.getenv("BATCH_WINDOW_SECONDS", "60"))
+
+logger = logging.getLogger("adim_scheduler")
+
+def fetch_schedules() -> List[Tuple[datetime, int]]:
+    """Fetch the upcoming index creation schedules from the API."""
+    response = get_client().get("/adim/schedules")
+    # The API answers 404 when there are no upcoming schedules
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+
+    schedules = ADIMScheduleResponse(**response.json()).schedules
+    return [(schedule.next_execution_time.replace(tzinfo=None), schedule.tc_query_id) for schedule in schedules]
+
+class ADIMScheduler:
+    """
+    Keeps the upcoming index creations in a priority queue of (next_execution_time, tc_query_id) and
+    fires each one at its time from this process. The queue, including the creations that are still running,
+    is written to QUEUE_FILE on every change and loaded on start.
+    """
+
+    def __init__(self) -> None:
+        self.queue: List[Tuple[datetime, int]] = []
+        # Creations that were fired but have not finished yet. They are persisted too, so a crash fires them again.
+        self.in_flight: Dict[int, datetime] = {}
+        # The last fired schedule of every query, so a refresh doesn't queue a schedule that already fired
+        self.last_fired: Dict[int, datetime] = {}
+        # References to the running tasks, the event loop only keeps weak ones
+        self.tasks: Set[asyncio.Task] = set()
+        self.wake_up = asyncio.Event()
+
+    def load(self) -> None:
+        """Load the persisted queue."""
+        if not os.path.exists(QUEUE_FILE):
+            return
+        try:
+            with open(QUEUE_FILE) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            logger.exception("Could not read the persisted queue %s, starting empty", QUEUE_FILE)
+            return
+        self.queue = [(datetime.fromisoformat(entry["next_execution_time"]), entry["tc_query_id"]) for entry in entries]
+        heapq.heapify(self.queue)
+        logger.info("Loaded %d schedules from %s", len(self.queue), QUEUE_FILE)
+
+    def save(self) -> None:
+        """Persist the queue atomically, a crash while writing leaves the previous file in place."""
+        entries = sorted(self.queue + [(execution_time, tc_query_id) for tc_query_id, execution_time in self.in_flight.items()])
+        os.makedirs(os.path.dirname(QUEUE_FILE) or ".", exist_ok=True)
+        temporary_file = f"{QUEUE_FILE}.tmp"
+        with open(temporary_file, "w") as f:
+            json.dump([
+                {"next_execution_time": execution_time.isoformat(), "tc_query_id": tc_query_id}
+                for execution_time, tc_query_id in entries
+            ], f)
+        os.replace(temporary_file, QUEUE_FILE)
+
+    def apply_schedules(self, schedules: List[Tuple[datetime, int]]) -> bool:
+        """
+        Replace the upcoming schedules with the ones of the API. Schedules that are already due are kept,
+        the API only returns future ones. Returns True if the queue changed.
+        """
+        now = datetime.now()
+        upcoming = {
+            tc_query_id: execution_time
+            for execution_time, tc_query_id in schedules
+            if self.last_fired.get(tc_query_id) != execution_time
+        }
+        queue = [
+            (execution_time, tc_query_id)
+            for execution_time, tc_query_id in self.queue
+            if execution_time <= now and tc_query_id not in upcoming
+        ]
+        queue.extend((execution_time, tc_query_id) for tc_query_id, execution_time in upcoming.items())
+        heapq.heapify(queue)
+
+        if sorted(queue) == sorted(self.queue):
+            return False
+        self.queue = queue
+        self.save()
+        return True
+
+    async def refresh(self) -> None:
+        """Refresh the queue from the API periodically and wake the timer when it changed."""
+        while True:
+            try:
+                schedules = await asyncio.to_thread(fetch_schedules)
+                if self.apply_schedules(schedules):
+                    logger.info("Schedules changed, %d queued", len(self.queue))
+                    self.wake_up.set()
+            except Exception:
+                logger.exception("Failed to refresh the schedules")
+            await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+
+    async def fire(self, due: List[Tuple[datetime, int]]) -> None:
+        """Trigger the index creation of the queries that are due together with one request."""
+        try:
+            await asyncio.to_thread(create_indexes, [tc_query_id for _, tc_query_id in due])
+        except Exception:
+            logger.exception("Index creation for queries %s failed", [tc_query_id for _, tc_query_id in due])
+        finally:
+            for _, tc_query_id in due:
+                self.in_flight.pop(tc_query_id, None)
+            self.save()
+
+    def start_task(self, coroutine) -> None:
+        """Run a coroutine in the background and keep a reference to it until it is done."""
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self) -> None:
+        """Fire the queued index creations at their time."""
+        self.load()
+        self.start_task(self.refresh())
+
+        while True:
+            now = datetime.now()
+            fired = False
+            due: List[Tuple[datetime, int]] = []
+            # Take the schedules that are due along with the ones that follow within the batch window
+            batch_until = now + timedelta(seconds=BATCH_WINDOW_SECONDS) if self.queue and self.queue[0][0] <= now else now
+            while self.queue and self.queue[0][0] <= batch_until:
+                execution_time, tc_query_id = heapq.heappop(self.queue)
+                fired = True
+                if now - execution_time > timedelta(seconds=MISSED_GRACE_SECONDS):
+                    logger.warning("Dropping the schedule of query %d at %s, it was missed", tc_query_id, execution_time)
+                    continue
+                logger.info("Creating the indexes of query %d scheduled at %s", tc_query_id, execution_time)
+                self.in_flight[tc_query_id] = execution_time
+                self.last_fired[tc_query_id] = execution_time
+                due.append((execution_time, tc_query_id))
+            if due:
+                self.start_task(self.fire(due))
+            if fired:
+                self.save()
+
+            # Sleep until the next schedule is due or the queue changes
+            timeout = (self.queue[0][0] - now).total_seconds() if self.queue else None
+            self.wake_up.clear()
+            try:
+                await asyncio.wait_for(self.wake_up.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(ADIMScheduler().run())
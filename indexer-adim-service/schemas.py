@@ -1,20 +1,7 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-class LoginRequest(BaseModel):
-    username: str
-    password: str
-
-
-class LoginResponse(BaseModel):
-    access_token: str
-    token_type: str
-    expires_in: int
-    refresh_token: str
-    scope: str
-
-
 class Schedules(BaseModel):
     tc_query_id: int
     next_execution_time: datetime
@@ -24,4 +11,17 @@ class ADIMScheduleResponse(BaseModel):
     schedules: List[Schedules]
 
 class CreateIndexRequest(BaseModel):
-    tc_query_id: int
\ No newline at end of file
+    tc_query_id: int
+
+class BulkCreateIndexRequest(BaseModel):
+    tc_query_ids: List[int]
+
+class QueryIndexCreationResult(BaseModel):
+    tc_query_id: int
+    success: bool
+    detail: Optional[str] = None
+    duration_seconds: float
+
+class BulkCreateIndexResponse(BaseModel):
+    results: List[QueryIndexCreationResult]
+    duration_seconds: float
@@ -0,0 +1,136 @@
+"""
+Client of the indexer API, shared by the ADIM service and the workload simulator.
+Both images install this package from the api-client build context, see their Dockerfiles.
+"""
+import os
+import json
+import time
+import threading
+import requests
+from typing import Any, Optional
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+load_dotenv()
+
+END_POINT = os.getenv("END_POINT")
+USER_NAME = os.getenv("USER_NAME")
+PASSWORD = os.getenv("PASSWORD")
+
+# The access token is cached in this file, so a restarted scheduler daemon or the next cron run of the simulator
+# reuses it instead of logging in again
+TOKEN_CACHE_FILE = os.getenv("TOKEN_CACHE_FILE", "/tmp/indexer_api_token.json")
+# A cached token is renewed this many seconds before it expires
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+# Number of keep-alive connections kept open to the API
+CONNECTION_POOL_SIZE = 10
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class LoginResponse(BaseModel):
+    access_token: str
+    token_type: str
+    expires_in: int
+    refresh_token: str
+    scope: str
+
+class APIClient:
+    """
+    Client of the indexer API. Requests go through one pooled requests.Session, so many calls share
+    keep-alive connections. The access token is reused from memory or from TOKEN_CACHE_FILE until shortly
+    before it expires, a login is only made when there is no valid token.
+    """
+
+    def __init__(self) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.access_token: Optional[str] = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def load_cached_token(self) -> None:
+        """Load the token of the configured API and user from the cache file if it is still valid."""
+        try:
+            with open(TOKEN_CACHE_FILE) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cached.get("end_point") != END_POINT or cached.get("user_name") != USER_NAME:
+            return
+        if cached.get("expires_at", 0) > time.time():
+            self.access_token = cached["access_token"]
+            self.expires_at = cached["expires_at"]
+
+    def save_cached_token(self) -> None:
+        """Write the token to the cache file, readable by the owner only."""
+        temporary_file = f"{TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+        try:
+            file_descriptor = os.open(temporary_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(file_descriptor, "w") as f:
+                json.dump({
+                    "end_point": END_POINT,
+                    "user_name": USER_NAME,
+                    "access_token": self.access_token,
+                    "expires_at": self.expires_at
+                }, f)
+            os.replace(temporary_file, TOKEN_CACHE_FILE)
+        except OSError as e:
+            print(f"Could not cache the access token: {e}")
+
+    def get_access_token(self, renew: bool = False) -> str:
+        """Return a valid access token, logging in only if there is no cached one or renew is set."""
+        with self.lock:
+            if not renew:
+                if self.access_token is None or self.expires_at <= time.time():
+                    self.load_cached_token()
+                if self.access_token is not None and self.expires_at > time.time():
+                    return self.access_token
+
+            response = self.session.post(
+                f"{END_POINT}/dba/login",
+                json=LoginRequest(username=USER_NAME, password=PASSWORD).model_dump()
+            )
+            response.raise_for_status()
+            login = LoginResponse(**response.json())
+            self.access_token = login.access_token
+            self.expires_at = time.time() + login.expires_in - TOKEN_EXPIRY_MARGIN_SECONDS
+            self.save_cached_token()
+            return self.access_token
+
+    def request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        """Send an authorized request. A rejected token (e.g. after a secret rotation) is renewed once."""
+        headers = kwargs.pop("headers", {})
+        response = self.session.request(
+            method,
+            f"{END_POINT}{path}",
+            headers={**headers, "Authorization": f"Bearer {self.get_access_token()}"},
+            **kwargs
+        )
+        if response.status_code == 401:
+            response = self.session.request(
+                method,
+                f"{END_POINT}{path}",
+                headers={**headers, "Authorization": f"Bearer {self.get_access_token(renew=True)}"},
+                **kwargs
+            )
+        return response
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+_client: Optional[APIClient] = None
+
+def get_client() -> APIClient:
+    """Return the client of this process, so every caller shares its connections and token."""
+    global _client
+    if _client is None:
+        _client = APIClient()
+    return _client
@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,6 +13,60 @@ class Settings(BaseSettings):
 
     ORG_DB_LOG_VOLUME_NAME: str
 
+    # Maximum number of bytes read from a log file in one go while tailing
+    LOG_READ_CHUNK_SIZE: int = 8 * 1024 * 1024
+
+    # log_destination of the organization database. csvlog and jsonlog are parsed from their fields instead of regexes
+    LOG_FORMAT: Literal["stderr", "csvlog", "jsonlog"] = "stderr"
+
+    # Number of worker processes that parse log chunks in parallel (1 parses inline in the ingestion worker)
+    LOG_PARSER_WORKERS: int = 1
+
+    # Number of query log rows written per COPY/executemany batch
+    QUERY_LOG_BATCH_SIZE: int = 10000
+
+    # Run the log ingestion worker inside the API process. Disable it when the worker runs as a separate process
+    # (python -m app.workers.ingestion_worker)
+    INGESTION_WORKER_ENABLED: bool = True
+    # Seconds between two ingestion passes and between two scheduling passes of the worker
+    INGESTION_INTERVAL_SECONDS: int = 60
+    SCHEDULING_INTERVAL_SECONDS: int = 3600
+
+    # Where the worker captures the executions of the time consuming queries from. "logs" tails the statement logs
+    # (log_statement=all), "pg_stat_statements" samples the calls counters, so statement logging can be turned off
+    WORKLOAD_CAPTURE_MODE: Literal["logs", "pg_stat_statements"] = "logs"
+    # Seconds between two pg_stat_statements samples. The sampled executions are timestamped with this resolution
+    STAT_SAMPLING_INTERVAL_SECONDS: int = 60
+    # Most query logs written per statement and sample. A larger calls delta (a hot statement or a counter reset)
+    # is spread over this many rows, each carrying its share of the calls
+    STAT_MAX_LOGS_PER_SAMPLE: int = 1000
+
+    # Number of deserialized trained models kept in memory for scheduling
+    MODEL_CACHE_SIZE: int = 64
+
+    # Seconds added to the estimated index build time when scheduling the index creation before a predicted execution
+    INDEX_BUILD_SAFETY_MARGIN_SECONDS: int = 900
+
+    # Index DDL runs CONCURRENTLY under this lock_timeout. Lock timeouts are retried with an exponential backoff
+    DDL_LOCK_TIMEOUT_MS: int = 5000
+    DDL_MAX_RETRIES: int = 5
+    DDL_RETRY_BACKOFF_SECONDS: float = 2.0
+    # Number of tables whose indexes are built at the same time
+    DDL_MAX_PARALLEL_TABLES: int = 2
+
+    # Model trainings run as background jobs in a pool of this many worker processes, which bounds the concurrent runs
+    TRAINING_MAX_CONCURRENT_JOBS: int = 1
+    # Number of jobs that may wait for a worker, further submissions are rejected
+    TRAINING_MAX_QUEUED_JOBS: int = 10
+    # Number of finished jobs whose status is kept
+    TRAINING_JOB_HISTORY_SIZE: int = 100
+    # Number of query log rows fetched per round trip when a model is trained from the logged executions
+    TRAINING_FETCH_CHUNK_SIZE: int = 50000
+    # Number of worker processes a hyperparameter search job trains its trials in
+    HYPERPARAMETER_SEARCH_MAX_PARALLEL_TRIALS: int = 2
+    # Number of best trials stored with the model of a search
+    HYPERPARAMETER_SEARCH_LEADERBOARD_SIZE: int = 10
+
     IS_DEV_MODE: bool = True
 
     USER: str
@@ -1,305 +1,277 @@
-import pickle
 from sqlalchemy.orm import Session
 from app.models.tc_query import TCQuery
 from app.models.query_log import QueryLog
-from app.models.trained_models import TrainedModel
 from app.models.index_maintenance_log import IndexMaintenanceLog
-from app.schemas.adim import ADIMScheduleResponse, Schedules
-import subprocess
+from app.models.log_file_checkpoint import LogFileCheckpoint
+from app.models.ingestion_batch import IngestionBatch
+from app.schemas.adim import ADIMScheduleResponse, Schedules, BulkCreateIndexResponse, QueryIndexCreationResult, IndexCreationResult
+from app.utils.query_matcher import QueryMatcher
+from app.utils.query_log_writer import bulk_insert_query_logs
+from app.utils.log_volume import LogFile, LogVolume, get_log_volume
+from app.utils.log_parser import parse_log_chunk, iter_complete_chunks
+from app.utils.stat_statements_sampler import sample_stat_statements
+from app.utils.model_cache import model_cache
+from app.utils.numpy_inference import predict_batched
+from app.utils.schedule_data import fetch_recent_executions, fetch_best_models, build_input_vectors
+from app.utils.index_build_estimator import IndexBuildEstimator
+from app.utils.index_ddl_executor import create_query_indexes, create_indexes_for_queries, drop_query_indexes
 from fastapi import HTTPException
-import os
-import re
-from typing import List, Optional, Dict
+import time
+import heapq
+from itertools import islice, repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator, List, Optional, Dict, Set, Tuple
 from app.config.settings import settings
-from difflib import SequenceMatcher
 from datetime import datetime
 import numpy as np
 from datetime import timedelta
-from sqlalchemy import text
+from sqlalchemy import or_
 
 #constants
-LOG_DIR = "/logs"
-IS_DEV = settings.IS_DEV_MODE
 LOG_FILENAME_PATTERN = "postgresql-%Y-%m-%d.log"
-VOLUME_NAME = "pg-org-logs"
-
-EXCLUDE_PATTERNS = [
-    r'/\*pga4dash\*/', 
-    r'^/pga4dash/$', 
-    r'pg_catalog',
-    r'pg_attribute',
-    r'pg_type',
-    r'pg_class',
-    r'pg_namespace',
-    r'attrelid=',
-    r'pg_depend',
-    r'pg_index',
-    r'pg_description',
-    r"SELECT at\..*",
-    r"SELECT n\..*",
-    r"SELECT nsp\..*",
-    r"SELECT rel\..*",
-    r"SELECT CASE\..*",
-    r"SELECT version\(\)",
-    r"SET .*",
-    r"COMMIT",
-    r"BEGIN"
-]
-
-def get_log_filenames() -> List[str]:
+LOG_READ_CHUNK_SIZE = settings.LOG_READ_CHUNK_SIZE
+LOG_PARSER_WORKERS = settings.LOG_PARSER_WORKERS
+LOG_FORMAT = settings.LOG_FORMAT
+WORKLOAD_CAPTURE_MODE = settings.WORKLOAD_CAPTURE_MODE
+INDEX_BUILD_SAFETY_MARGIN_SECONDS = settings.INDEX_BUILD_SAFETY_MARGIN_SECONDS
+
+def build_query_matcher(db: Session) -> QueryMatcher:
+    """Build the fingerprint matcher over all time consuming queries."""
+    tc_queries = db.query(TCQuery.id, TCQuery.query).order_by(TCQuery.id).all()
+    return QueryMatcher((tc_query.id, tc_query.query) for tc_query in tc_queries)
+
+def insert_query_logs(db: Session, user_entries: List[Dict[str, Any]], commit: bool = True, matcher: Optional[QueryMatcher] = None) -> None:
     """
-    Get the list of log filenames in the log directory.
-    """
-    if IS_DEV:
-        cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{VOLUME_NAME}:/logs",
-            "alpine", "sh", "-c", "ls /logs"
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise  HTTPException(
-                status_code=500,
-                detail=f"Error fetching log files: {result.stderr.strip()}"
-            )
-        return [f for f in result.stdout.strip().split("\n") if f.endswith(".log")]
-    else:
-        return [f for f in os.listdir(LOG_DIR) if f.endswith(".log")]
-
-def read_log_file(filename: str) -> str:
-    """Read content of a log file from volume or local path."""
-    if IS_DEV:
-        cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{VOLUME_NAME}:/logs",
-            "alpine", "cat", f"/logs/{filename}"
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error reading log file: {result.stderr.strip()}"
-            )
-        return result.stdout
-    else:
-        path = os.path.join(LOG_DIR, filename)
-        with open(path, "r") as f:
-            return f.read()
-        
-def delete_log_file(filename: str) -> None:
-    """Delete a log file from volume or local path."""
-    if IS_DEV:
-        cmd = [
-            "docker", "run", "--rm",
-            "-v", f"{VOLUME_NAME}:/logs",
-            "alpine", "rm", f"/logs/{filename}"
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"Failed to delete {filename}: {result.stderr}")
-    else:
-        os.remove(os.path.join(LOG_DIR, filename))
-    
-def parse_log_content(content: str) -> List[Dict[str, str]]:
-    """
-    Parse the PostgreSQL log file and extract user queries.
-    Only entries that do not contain internal system references (like "pg_catalog")
-    are retained.
-    """
-    user_entries: List[Dict[str, str]] = []
-    current_entry: Dict[str, str] = {}
-    collecting_query = False
-    query_lines: List[str] = []
-
-    # Match timestamp + statement line
-    stmt_pattern = re.compile(
-        r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+ (?:[+\-]\d{4}|[A-Z]+)) \[.*?\] LOG:\s+statement:\s+(.*)$"
-    )
-
-    # Match start of a new log line to stop query collection
-    new_log_entry_pattern = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+")
-
-    for line in content.splitlines():
-        line = line.rstrip()
-
-        stmt_match = stmt_pattern.match(line)
-        if stmt_match:
-            # Save previous collected query
-            if current_entry and query_lines:
-                current_entry["query_text"] = "\n".join(query_lines).strip()
-                if 'pg_catalog' not in current_entry["query_text"].lower():
-                    user_entries.append(current_entry)
-
-            # Start new entry
-            current_entry = {
-                "timestamp": stmt_match.group(1),
-            }
-            query_lines = [stmt_match.group(2)]
-            collecting_query = True
-        elif collecting_query:
-            # If line starts like a new timestamped log, stop collecting
-            if new_log_entry_pattern.match(line):
-                # Save current before resetting
-                current_entry["query_text"] = "\n".join(query_lines).strip()
-                if 'pg_catalog' not in current_entry["query_text"].lower():
-                    user_entries.append(current_entry)
-                collecting_query = False
-                query_lines = []
-                current_entry = {}
-            else:
-                # It's a continuation line
-                query_lines.append(line.strip())
-
-    # Append last query if still collecting at EOF
-    if collecting_query and current_entry and query_lines:
-        current_entry["query_text"] = "\n".join(query_lines).strip()
-        if 'pg_catalog' not in current_entry["query_text"].lower():
-            user_entries.append(current_entry)
-
-    return user_entries
-
-def normalize_query(query: str) -> str:
-    """
-    Normalize SQL queries by:
-    - Lowercasing
-    - Replacing literals and positional params with a generic placeholder
-    - Removing extra whitespace
+    Insert log entries into the database if the query matches an entry in TCQuery (fuzzily).
+    Entries may carry their source_file and source_offset, an entry from the same position is inserted only once.
+    When commit is False the caller is responsible for committing, so the inserted rows can
+    share a transaction with other changes such as a log file checkpoint. A matcher built once
+    for the whole batch can be passed in, otherwise one is built from the TCQuery table.
     """
-    query = query.lower()
-
-    # Replace string literals
-    query = re.sub(r"'[^']*'", "$VAL$", query)
+    if matcher is None:
+        matcher = build_query_matcher(db)
 
-    # Replace numeric literals
-    query = re.sub(r"\b\d+(\.\d+)?\b", "$VAL$", query)
+    tc_query_ids: List[int] = []
+    timestamps: List[str] = []
+    source_files: List[Optional[str]] = []
+    source_offsets: List[Optional[int]] = []
+    for entry in user_entries:
+        query_text = entry.get('query_text')
+        if not query_text:
+            continue
 
-    # Replace positional params like $1, $2 with $VAL$
-    query = re.sub(r"\$\d+", "$VAL$", query)
+        matched_tc_query_id = matcher.match(query_text)
+        if matched_tc_query_id is None:
+            continue
 
-    # Normalize whitespace
-    query = re.sub(r"\s+", " ", query).strip()
+        tc_query_ids.append(matched_tc_query_id)
+        timestamps.append(entry.get('timestamp'))
+        source_files.append(entry.get('source_file'))
+        source_offsets.append(entry.get('source_offset'))
 
-    return query
+    # Write the matched entries in bulk instead of one ORM object per entry. Entries that were ingested before are skipped.
+    bulk_insert_query_logs(db, tc_query_ids, timestamps, source_files, source_offsets)
 
-def is_query_match(log_query: str, tc_query_text: str, threshold: float = 0.9) -> bool:
-    """Fuzzy match normalized log query and TC query."""
-    norm_log = normalize_query(log_query)
-    norm_tc = normalize_query(tc_query_text)
+    if commit:
+        db.commit()
 
-    similarity = SequenceMatcher(None, norm_log, norm_tc).ratio()
-    return similarity >= threshold
+def iter_pending_chunks(log_volume: LogVolume, log_files: Dict[str, LogFile], checkpoints: Dict[str, LogFileCheckpoint], rotated: Set[str]) -> Iterator[Tuple[LogFileCheckpoint, int, bytes]]:
+    """Read the pending bytes of the given log files and yield them as chunks of complete log entries with their file offset."""
+    ranges = [(filename, checkpoints[filename].byte_offset, log_file.size) for filename, log_file in log_files.items()]
+    for filename, stream in log_volume.open_log_files(ranges):
+        offset = checkpoints[filename].byte_offset
+        length = log_files[filename].size - offset
+        for chunk_offset, chunk in iter_complete_chunks(stream, length, LOG_READ_CHUNK_SIZE, filename in rotated, LOG_FORMAT, offset):
+            yield checkpoints[filename], chunk_offset, chunk
 
-def insert_query_logs(db: Session, user_entries: List[Dict[str, Optional[str]]]) -> None:
+def get_ingested_until(db: Session, checkpoints: Dict[str, LogFileCheckpoint]) -> Dict[str, int]:
     """
-    Insert log entries into the database if the query matches an entry in TCQuery (fuzzily).
+    Return, per log file, the offset up to which the ingestion ledger shows the file as ingested without gaps.
+    Only the ledger batches of the current inode of a file count.
     """
-    all_tc_queries = db.query(TCQuery).all()
-
-    for entry in user_entries:
-        query_text = entry.get('query_text')
-        if not query_text:
+    ingested_until = {filename: 0 for filename in checkpoints}
+    batches = db.query(IngestionBatch).filter(
+        IngestionBatch.source_file.in_(list(checkpoints))
+    ).order_by(IngestionBatch.source_file, IngestionBatch.start_offset).all()
+    for batch in batches:
+        if batch.inode != checkpoints[batch.source_file].inode:
             continue
+        if batch.start_offset <= ingested_until[batch.source_file]:
+            ingested_until[batch.source_file] = max(ingested_until[batch.source_file], batch.end_offset)
+    return ingested_until
 
-        matched_tc_query = None
-        for tc_query in all_tc_queries:
-            if is_query_match(query_text, tc_query.query):
-                matched_tc_query = tc_query
-                break
+def ingest_chunks(db: Session, chunks: Iterator[Tuple[LogFileCheckpoint, int, bytes]], matcher: QueryMatcher, ingested_until: Dict[str, int], executor: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Parse the chunks and insert the matched queries.
+    Without an executor every chunk is parsed inline and committed on its own. With an executor a round of chunks is
+    fanned out to the worker processes (about two chunks per worker), their entries are merged in timestamp order and inserted in one transaction.
+    The query logs, the ingestion ledger and the advanced byte offsets are always committed together. Chunks that the ledger
+    already shows as ingested are skipped, and query logs that already exist are skipped by the unique source position.
+    """
+    # Two chunks per worker keep every process busy while the previous round is being inserted
+    round_size = LOG_PARSER_WORKERS * 2 if executor else 1
+    parse = executor.map if executor else map
+    while True:
+        batch = list(islice(chunks, round_size))
+        if not batch:
+            break
+
+        new_chunks = [
+            (checkpoint, chunk_offset, chunk) for checkpoint, chunk_offset, chunk in batch
+            if chunk_offset + len(chunk) > ingested_until.get(checkpoint.filename, 0)
+        ]
+        parsed_chunks = parse(
+            parse_log_chunk,
+            [chunk for _, _, chunk in new_chunks],
+            repeat(LOG_FORMAT, len(new_chunks)),
+            [chunk_offset for _, chunk_offset, _ in new_chunks]
+        )
 
-        if not matched_tc_query:
-            continue
+        entries_per_chunk = []
+        for (checkpoint, chunk_offset, chunk), entries in zip(new_chunks, parsed_chunks):
+            entries_per_chunk.append([(timestamp, query_text, checkpoint.filename, offset) for timestamp, query_text, offset in entries])
+            db.add(IngestionBatch(
+                source_file=checkpoint.filename,
+                inode=checkpoint.inode,
+                start_offset=chunk_offset,
+                end_offset=chunk_offset + len(chunk),
+                entries=len(entries)
+            ))
+
+        # Entries are in timestamp order within a chunk, so a k-way merge orders the whole round
+        user_entries = [
+            {"timestamp": timestamp, "query_text": query_text, "source_file": source_file, "source_offset": source_offset}
+            for timestamp, query_text, source_file, source_offset in heapq.merge(*entries_per_chunk, key=lambda entry: entry[0])
+        ]
+        if user_entries:
+            insert_query_logs(db, user_entries, commit=False, matcher=matcher)
 
-        # Create a new QueryLog entry
-        query_log = QueryLog(
-            tc_query_id=matched_tc_query.id,
-            time_stamp=entry.get('timestamp'),
-            optimized=False  # Default to False
-        )
-        # Add to the session
-        db.add(query_log)
+        for checkpoint, chunk_offset, chunk in batch:
+            checkpoint.byte_offset = chunk_offset + len(chunk)
+            checkpoint.updated_at = datetime.now()
+        db.commit()
 
+def ingest_pending_logs(db: Session, executor: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Ingest the new bytes of every log file in the log volume.
+    PostgreSQL names the log files by their creation time, so every file except the latest one has been rotated.
+    A file is deleted only once it has been rotated and fully consumed.
+    The chunks are parsed in the given process pool, which the caller keeps across passes, or inline without one.
+    """
+    log_volume = get_log_volume()
+    log_files = sorted(log_volume.list_log_files(), key=lambda log_file: log_file.filename)
+    filenames = [log_file.filename for log_file in log_files]
+    rotated = set(filenames[:-1])
+
+    # Drop the checkpoints and ledger batches of files that no longer exist (e.g. deleted right before a crash)
+    db.query(LogFileCheckpoint).filter(
+        LogFileCheckpoint.filename.notin_(filenames)
+    ).delete(synchronize_session=False)
+    db.query(IngestionBatch).filter(
+        IngestionBatch.source_file.notin_(filenames)
+    ).delete(synchronize_session=False)
+
+    checkpoints = {checkpoint.filename: checkpoint for checkpoint in db.query(LogFileCheckpoint).all()}
+    for log_file in log_files:
+        checkpoint = checkpoints.get(log_file.filename)
+        if not checkpoint:
+            checkpoint = LogFileCheckpoint(filename=log_file.filename, inode=log_file.inode, byte_offset=0)
+            db.add(checkpoint)
+            checkpoints[log_file.filename] = checkpoint
+        elif checkpoint.inode != log_file.inode or checkpoint.byte_offset > log_file.size:
+            # The file was replaced or truncated, so start over from the beginning. Its ledger batches describe the
+            # old content and would make the new bytes look ingested, drop them along with the checkpoint reset.
+            checkpoint.inode = log_file.inode
+            checkpoint.byte_offset = 0
+            db.query(IngestionBatch).filter(
+                IngestionBatch.source_file == log_file.filename
+            ).delete(synchronize_session=False)
     db.commit()
 
+    # Read the pending byte ranges of all the files in one batch
+    pending = {
+        log_file.filename: log_file for log_file in log_files
+        if checkpoints[log_file.filename].byte_offset < log_file.size
+    }
+    chunks = iter_pending_chunks(log_volume, pending, checkpoints, rotated)
+    ingested_until = get_ingested_until(db, {filename: checkpoints[filename] for filename in pending})
+
+    # The matcher is built once and shared by all the files of this pass
+    matcher = build_query_matcher(db)
+    ingest_chunks(db, chunks, matcher, ingested_until, executor)
+
+    # Delete the rotated files that have been fully consumed in one batch
+    consumed = [
+        log_file.filename for log_file in log_files
+        if log_file.filename in rotated and checkpoints[log_file.filename].byte_offset >= log_file.size
+    ]
+    if consumed:
+        log_volume.delete_log_files(consumed)
+        db.query(LogFileCheckpoint).filter(
+            LogFileCheckpoint.filename.in_(consumed)
+        ).delete(synchronize_session=False)
+        # The ledger only guards files that still exist, a later file may reuse the name and inode
+        db.query(IngestionBatch).filter(
+            IngestionBatch.source_file.in_(consumed)
+        ).delete(synchronize_session=False)
+        db.commit()
+
 def schedule_next_exec_times(db_org: Session, db_b_plus: Session, window_size: int = 10) -> ADIMScheduleResponse:
     """Predict the next execution time for each time consuming query and return the schedules."""
 
     # The schedules list to be returned
     schedules: List[Schedules] = []
 
-    # Fetch all time consuming queries
-    tc_queries = db_b_plus.query(TCQuery).all()
-
-    # Iterate through each time consuming query
-    for tc_query in tc_queries:
-        # Continue if the auto_indexing is not enabled
-        if not tc_query.auto_indexing: 
-            continue
-
-        # Continue if the next_time_execution is already set and greater than the current time stamp.
-        if tc_query.next_time_execution is not None and tc_query.next_time_execution > datetime.now():
-            continue
-
-        # Get the last 11 queries for from  the QueryLog table using the tc_query_id
-        last_queries = db_b_plus.query(QueryLog).filter(
-            QueryLog.tc_query_id == tc_query.id
-        ).order_by(QueryLog.time_stamp.desc()).limit(window_size + 1).all()
-
-        if not last_queries:
-            continue
-
-        if len(last_queries) < window_size+1:
-            # If there are not enough queries, we cannot predict the next execution time
-            continue
-
-        # Set optimized of the query log to true if the time_stamp of the query log is greater than the next_time_execution of the tc_query
-        if tc_query.next_time_execution is not None:
-            for query_log in last_queries:
-                if query_log.time_stamp > tc_query.next_time_execution:
-                    query_log.optimized = True
-        
-        # Predict the next execution time based on the last queries
-        # Fetch the model row that has the highest r2_percentage for the current tc_query
-        model_row  = db_b_plus.query(TrainedModel).filter(
-            TrainedModel.tc_query_id == tc_query.id
-        ).order_by(TrainedModel.r2_percentage.desc()).first()
-
-        if not model_row:
-            continue
-
-        # Load model and scalers
-        model = pickle.loads(model_row.model_data)
-        scaler_X = pickle.loads(model_row.scaler_x)
-        scaler_y = pickle.loads(model_row.scaler_y)
-
-        last_queries = sorted(last_queries, key=lambda last_queries: last_queries.time_stamp)
-        
-        deltas = [
-            (last_queries[i + 1].time_stamp - last_queries[i].time_stamp).total_seconds()
-            for i in range(window_size)
-        ]
+    # Fetch the auto indexed queries whose next execution is not set or already passed
+    now = datetime.now()
+    tc_queries = {
+        tc_query.id: tc_query
+        for tc_query in db_b_plus.query(TCQuery).filter(
+            TCQuery.auto_indexing.is_(True),
+            or_(TCQuery.next_time_execution.is_(None), TCQuery.next_time_execution <= now)
+        ).all()
+    }
+
+    # Get the last 11 executions of every query in one round trip. Queries without enough executions cannot be predicted.
+    query_ids, log_ids, timestamps = fetch_recent_executions(db_b_plus, list(tc_queries), window_size)
+
+    # Set optimized of the query logs to true if their time_stamp is greater than the next_time_execution of the tc_query
+    next_executions = np.array(
+        [tc_queries[tc_query_id].next_time_execution or datetime.max for tc_query_id in query_ids.tolist()],
+        dtype="datetime64[us]"
+    )
+    optimized_ids = log_ids[timestamps > next_executions[:, None]]
+    if optimized_ids.size:
+        db_b_plus.query(QueryLog).filter(
+            QueryLog.id.in_(optimized_ids.tolist())
+        ).update({QueryLog.optimized: True}, synchronize_session=False)
 
-        # Get last timestamp's hour/weekday
-        last_ts = last_queries[-1].time_stamp
-        hour = last_ts.hour
-        weekday = last_ts.weekday()
+    # Fetch the model row that has the highest r2_percentage for every query in one round trip
+    model_rows = fetch_best_models(db_b_plus, query_ids.tolist())
+    has_model = np.array([tc_query_id in model_rows for tc_query_id in query_ids.tolist()], dtype=bool)
+    query_ids, timestamps = query_ids[has_model], timestamps[has_model]
 
-        # Build input vector
-        sin_hour = np.sin(2 * np.pi * hour / 24)
-        cos_hour = np.cos(2 * np.pi * hour / 24)
-        sin_weekday = np.sin(2 * np.pi * weekday / 7)
-        cos_weekday = np.cos(2 * np.pi * weekday / 7)
+    # Load the models and their scalers as NumPy arrays, the cache keeps them between scheduling passes
+    networks = [model_cache.get(model_rows[tc_query_id]).network for tc_query_id in query_ids.tolist()]
+    pending = [(tc_queries[tc_query_id], last_ts) for tc_query_id, last_ts in zip(query_ids.tolist(), timestamps[:, -1].tolist())]
 
-        input_vector = np.array(deltas + [sin_hour, cos_hour, sin_weekday, cos_weekday]).reshape(1, -1)
-        input_scaled = scaler_X.transform(input_vector)
+    # Predict the deltas of all queries at once, one forward pass per group of models with the same architecture
+    predicted_deltas = predict_batched(networks, build_input_vectors(timestamps)) if pending else []
 
-        # Predict delta and convert back
-        predicted_scaled = model.predict(input_scaled)
-        predicted_delta = scaler_y.inverse_transform(predicted_scaled)[0][0]
+    # Estimates the build time of the indexes from the table sizes and the past builds
+    estimator = IndexBuildEstimator(db_org, db_b_plus)
 
+    for (tc_query, last_ts), predicted_delta in zip(pending, predicted_deltas):
         predicted_time = last_ts + timedelta(seconds=float(predicted_delta))
 
-        # Set the predicted_time 6 hours before
-        predicted_time = predicted_time - timedelta(hours=6)
+        # Schedule the index creation so the indexes are built, with a safety margin, before the predicted execution
+        tc_query.estimated_time_for_indexes = estimator.estimate(tc_query.indexes or [])
+        predicted_time = predicted_time - timedelta(seconds=tc_query.estimated_time_for_indexes + INDEX_BUILD_SAFETY_MARGIN_SECONDS)
+
+        # The ingestion worker schedules periodically. If no new execution was logged since the last schedule, the
+        # prediction is the same one that is already due, so keep the indexes that were created for it.
+        if predicted_time <= datetime.now():
+            continue
 
         # Delete all the existing indexes for the tc_query if predicted_time-current time is greater than 5 hours. Otherwise, continue the loop
         # if (predicted_time - datetime.now()) < timedelta(hours=5):
@@ -315,9 +287,7 @@ def schedule_next_exec_times(db_org: Session, db_b_plus: Session, window_size: i
             continue
         # Delete the indexes from the database
         # Have to track that the indexes were dropped in this time if exists
-        for index in indexes:
-            db_org.execute(text(f"DROP INDEX IF EXISTS {index}"))
-        db_org.commit()
+        drop_query_indexes(db_org, indexes)
 
         # Create a new IndexMaintenanceLog entry. Dropping the indexes is recorded as index_created=False
         index_maintenance_log = IndexMaintenanceLog(
@@ -345,26 +315,37 @@ def schedule_next_exec_times(db_org: Session, db_b_plus: Session, window_size: i
     return ADIMScheduleResponse(schedules=schedules)
     
 
-def get_adim_schedules(db_org: Session, db_b_plus: Session) -> ADIMScheduleResponse:
-    """This function read logs from pg-org-logs volume and insert them into the database. Then it will predicts the next execution time for each time consuming query and returns the schedules
-    along with the query id and the next execution time."""
-    log_filenames = get_log_filenames()
-    if log_filenames:
-        for filename in log_filenames:
-            content = read_log_file(filename)
-            if not content:
-                continue
-            #Print the first 1000 characters of the log file content for debugging
-            user_entries = parse_log_content(content)
-            if user_entries:
-                insert_query_logs(db_b_plus, user_entries)
-            delete_log_file(filename)
-    
+def run_ingestion_pass(db_org: Session, db_b_plus: Session, schedule: bool = True, executor: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Capture the new executions and, if requested, predict the next execution times of the time consuming queries.
+    The log chunks are parsed in the given process pool, if any.
+    """
+    if WORKLOAD_CAPTURE_MODE == "pg_stat_statements":
+        # Turn the calls counter deltas since the last sample into query logs
+        sample_stat_statements(db_org, db_b_plus)
+    else:
+        # Ingest only the bytes written since the last checkpoint of each log file
+        ingest_pending_logs(db_b_plus, executor)
+
     # Schedule the next execution times for the time consuming queries
-    schedules_response = schedule_next_exec_times(db_org, db_b_plus)
-    if not schedules_response.schedules:
+    if schedule:
+        schedule_next_exec_times(db_org, db_b_plus)
+
+def get_adim_schedules(db_b_plus: Session) -> ADIMScheduleResponse:
+    """This function returns the upcoming index creation schedules along with the query id and the next execution time.
+    The logs are ingested and the schedules are predicted by the ingestion worker, so this only reads the stored state."""
+    tc_queries = db_b_plus.query(TCQuery.id, TCQuery.next_time_execution).filter(
+        TCQuery.auto_indexing.is_(True),
+        TCQuery.next_time_execution > datetime.now()
+    ).order_by(TCQuery.next_time_execution).all()
+
+    if not tc_queries:
         raise HTTPException(status_code=404, detail="No schedules found.")
-    return schedules_response
+
+    return ADIMScheduleResponse(schedules=[
+        Schedules(tc_query_id=tc_query.id, next_execution_time=tc_query.next_time_execution)
+        for tc_query in tc_queries
+    ])
 
 def create_index_using_query_id(db_org: Session, db_b_plus: Session, tc_query_id: int) -> None:
     """Create indexes for the given TCQuery ID."""
@@ -382,15 +363,8 @@ def create_index_using_query_id(db_org: Session, db_b_plus: Session, tc_query_id
     if not index_commands:
         raise HTTPException(status_code=404, detail="No indexes found for this query.")
     
-    # Execute each index creation command
-    for command in index_commands:
-        try:
-            db_org.execute(text(command))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error creating index: {str(e)}")
-    
-    # Commit the changes
-    db_org.commit()
+    # Create the indexes concurrently, so the builds don't block writes, and measure them for the build time estimates
+    create_query_indexes(db_org, db_b_plus, tc_query_id, index_commands)
 
     # Log the index creation in IndexMaintenanceLog
     index_maintenance_log = IndexMaintenanceLog(
@@ -402,15 +376,57 @@ def create_index_using_query_id(db_org: Session, db_b_plus: Session, tc_query_id
     db_b_plus.add(index_maintenance_log)
     db_b_plus.commit()
 
+def create_indexes_using_query_ids(db_org: Session, db_b_plus: Session, tc_query_ids: List[int]) -> BulkCreateIndexResponse:
+    """
+    Create the indexes of several TCQueries in one pass.
+    Statements shared between the queries are built once. A query that can't be indexed or whose builds fail
+    is reported in its result, it doesn't fail the others.
+    """
+    started = time.perf_counter()
+    # Keep the order of the request, a repeated ID is handled once
+    tc_query_ids = list(dict.fromkeys(tc_query_ids))
+    tc_queries = {
+        tc_query.id: tc_query
+        for tc_query in db_b_plus.query(TCQuery).filter(TCQuery.id.in_(tc_query_ids)).all()
+    }
+
+    # Check every query the same way as the single query endpoint
+    rejected: Dict[int, str] = {}
+    commands_by_query: Dict[int, List[str]] = {}
+    for tc_query_id in tc_query_ids:
+        tc_query = tc_queries.get(tc_query_id)
+        if not tc_query:
+            rejected[tc_query_id] = "TCQuery not found."
+        elif not tc_query.auto_indexing:
+            rejected[tc_query_id] = "Auto indexing is not enabled for this query."
+        elif not tc_query.indexes:
+            rejected[tc_query_id] = "No indexes found for this query."
+        else:
+            commands_by_query[tc_query_id] = list(tc_query.indexes)
+
+    index_results = create_indexes_for_queries(db_org, db_b_plus, commands_by_query) if commands_by_query else {}
+
+    results = []
+    now = datetime.now()
+    for tc_query_id in tc_query_ids:
+        if tc_query_id in rejected:
+            results.append(QueryIndexCreationResult(
+                tc_query_id=tc_query_id, success=False, detail=rejected[tc_query_id], duration_seconds=0.0, indexes=[]
+            ))
+            continue
 
+        indexes = [IndexCreationResult(**result._asdict()) for result in index_results[tc_query_id]]
+        failed = [index for index in indexes if not index.success]
+        results.append(QueryIndexCreationResult(
+            tc_query_id=tc_query_id,
+            success=not failed,
+            detail="Error creating index: " + "; ".join(f"{index.index_name or index.command}: {index.error}" for index in failed) if failed else None,
+            duration_seconds=sum(index.duration_seconds for index in indexes),
+            indexes=indexes
+        ))
+        # Log the index creation of the queries whose indexes were all created, in one commit
+        if not failed:
+            db_b_plus.add(IndexMaintenanceLog(tc_query_id=tc_query_id, time_stamp=now, index_created=True))
+    db_b_plus.commit()
 
-
-
-
-
-
-
-
-
-
-
+    return BulkCreateIndexResponse(results=results, duration_seconds=time.perf_counter() - started)
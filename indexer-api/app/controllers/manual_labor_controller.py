@@ -4,6 +4,7 @@ from app.schemas.diagnostics import TCQueryResponse
 from app.schemas.manual_labor import DeleteTimeConsumingQueryRequest, IndexStatus, IndexStatusResponse, StatQueryResponse, StatQuery, CreateTCQueryRequest, ChangeAutoIndexingRequest, RemoveIndexRequest, AddIndexRequest
 from fastapi import HTTPException, status
 from app.controllers.diagnostics_controller import find_time_consuming_queries, find_best_indexes
+from app.utils.index_ddl_executor import create_query_indexes, drop_query_indexes
 from sqlalchemy import text
 
 
@@ -82,15 +83,8 @@ def create_index_using_query_id(db_org: Session, db_b_plus: Session, tc_query_id
     if not index_commands:
         raise HTTPException(status_code=404, detail="No indexes found for this query.")
     
-    # Execute each index creation command
-    for command in index_commands:
-        try:
-            db_org.execute(text(command))
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error creating index: {str(e)}")
-    
-    # Commit the changes
-    db_org.commit()
+    # Create the indexes concurrently, so the builds don't block writes, and measure them for the build time estimates
+    create_query_indexes(db_org, db_b_plus, tc_query_id, index_commands)
 
 def delete_index_using_query_id(db_org: Session, db_b_plus: Session, tc_query_id: int) -> None:
     """Delete indexes for the given TCQuery ID."""
@@ -108,9 +102,7 @@ def delete_index_using_query_id(db_org: Session, db_b_plus: Session, tc_query_id
         raise HTTPException(status_code=404, detail="No valid indexes found for this query.")
     
     # Delete the indexes from the database
-    for index in indexes:
-        db_org.execute(text(f"DROP INDEX IF EXISTS {index}"))
-    db_org.commit()
+    drop_query_indexes(db_org, indexes)
 
 def get_index_status(db_org: Session, db_b_plus: Session, tc_query_id: int) -> IndexStatusResponse:
     """
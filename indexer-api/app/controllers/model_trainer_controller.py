@@ -1,52 +1,46 @@
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from app.schemas.model_trainer import ModelTrainingResponse, ModelTrainingResponseForFetchAttributes
+from app.schemas.model_trainer import ModelTrainingResponse, ModelTrainingResponseForFetchAttributes, ModelCacheStatsResponse, TrainingJobResponse, TrainingJobStatusResponse, TrainingJobListResponse, HyperparameterSearchRequest
 from app.models.trained_models import TrainedModel
+from app.utils.model_cache import model_cache
+from app.utils.numpy_inference import DenseNetwork
+from app.utils.window_dataset import create_dataset, cyclic_features
+from app.utils.execution_history import fetch_execution_series
+from app.workers.training_jobs import training_jobs, run_training_job, run_search_job
+from app.utils.hyperparameter_search import search_space
 import numpy as np
-import pandas as pd
-from tensorflow import keras
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from tensorflow.keras.callbacks import EarlyStopping
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score
-import pickle
 from fastapi import HTTPException
 
-def create_dataset(deltas: List[float], sin_hour: List[float], cos_hour: List[float], sin_weekday: List[float], cos_weekday: List[float], window_size: int)-> Tuple[np.ndarray, np.ndarray]:
-    """
-    This function is used to create a dataset from the provided time series data. 
-    """
-    X, y = [], []
-    for i in range(len(deltas) - window_size):
-        window = deltas[i:i + window_size]
-        extra_features = [
-            sin_hour[i + window_size],
-            cos_hour[i + window_size],
-            sin_weekday[i + window_size],
-            cos_weekday[i + window_size]
-        ]
-        X.append(np.hstack((window, extra_features)))
-        y.append(deltas[i + window_size])
-    return np.array(X), np.array(y)
-
-
-def get_training_data_from_file(file: Any) -> pd.DataFrame:
+# TensorFlow, pandas and scikit-learn take seconds and hundreds of MB to import. They are imported in the
+# functions that train a model, so the API starts without them and scheduling never loads them.
+if TYPE_CHECKING:
+    import pandas as pd
+    from tensorflow import keras
+    from sklearn.preprocessing import StandardScaler
+
+# Columns of the cyclic time features in the training data frame, in the order of the model inputs
+TIME_FEATURE_COLUMNS = ['sin_hour', 'cos_hour', 'sin_weekday', 'cos_weekday']
+# Number of past deltas the models get as input, the scheduler feeds them the same window
+WINDOW_SIZE = 10
+
+def get_training_data_from_file(file: Optional[BinaryIO]) -> "pd.DataFrame":
     """
-    This function is used to create the dataframe from the provided file.
+    This function is used to create the dataframe from the provided CSV file object.
     """
+    import pandas as pd
+
     if not file:
         raise HTTPException(status_code=400, detail="Training data file is required when using_files is True")
     
     try:
-        df = pd.read_csv(file.file, parse_dates=['executed_at'])
+        df = pd.read_csv(file, parse_dates=['executed_at'])
         if df.empty:
             raise HTTPException(status_code=400, detail="Training data file is empty")
         
         df.sort_values('executed_at', inplace=True)
 
-        # Convert time stamps to unix time (seconds)
-        df['unix_time'] = df['executed_at'].view('int64') // 10**9
+        # Convert time stamps to unix time (seconds). The resolution of parsed datetimes varies with the pandas version.
+        df['unix_time'] = df['executed_at'].dt.as_unit('s').astype('int64')
 
         # Compute inter-arrival times (deltas) between consecutive executions
         df['delta'] = df['unix_time'].diff()
@@ -58,21 +52,41 @@ def get_training_data_from_file(file: Any) -> pd.DataFrame:
         df['hour'] = df['executed_at'].dt.hour
         df['weekday'] = df['executed_at'].dt.weekday
 
-        # Create sine and cosine features for hour and weekday
-        df['sin_hour'] = np.sin(2 * np.pi * df['hour'] / 24)
-        df['cos_hour'] = np.cos(2 * np.pi * df['hour'] / 24)
-        df['sin_weekday'] = np.sin(2 * np.pi * df['weekday'] / 7)
-        df['cos_weekday'] = np.cos(2 * np.pi * df['weekday'] / 7)
+        # Create sine and cosine features for hour and weekday, the same encoding the scheduler uses
+        df[TIME_FEATURE_COLUMNS] = cyclic_features(df['hour'].to_numpy(), df['weekday'].to_numpy())
 
         return df
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading training data file: {str(e)}")
 
-def pre_processing(X_raw: np.ndarray, y_raw: np.ndarray) -> Tuple[np.ndarray, np.ndarray, StandardScaler, StandardScaler]:
+def load_training_dataset(db: Session, query_id: int, training_data: Optional[BinaryIO]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This function builds the raw training set of a query, from the uploaded CSV file if there is one and
+    otherwise from the executions in query_logs.
+    """
+    if training_data is not None:
+        df = get_training_data_from_file(training_data)
+        deltas = df['delta'].to_numpy(dtype=np.float64)
+        features = df[TIME_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    else:
+        deltas, features = fetch_execution_series(db, query_id)
+        # End the read transaction, it would stay idle for the whole training otherwise
+        db.rollback()
+        if len(deltas) <= WINDOW_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Query {query_id} doesn't have enough logged executions for training, at least {WINDOW_SIZE + 2} are needed"
+            )
+
+    return create_dataset(deltas, features, WINDOW_SIZE)
+
+def pre_processing(X_raw: np.ndarray, y_raw: np.ndarray) -> Tuple[np.ndarray, np.ndarray, "StandardScaler", "StandardScaler"]:
     """
     This function is used to preprocess the raw data by scaling the features and target variable.
     It returns the scaled features, scaled target variable, and the scaler object.
     """
+    from sklearn.preprocessing import StandardScaler
+
     scaler_X = StandardScaler()
     scaler_y = StandardScaler()
 
@@ -85,11 +99,14 @@ def model_definition(
     number_of_hidden_layers: int,
     number_of_neurons_per_layer: int,
     X_scaled: np.ndarray,
-) -> keras.Model:
+) -> "keras.Model":
     """
     This function defines the model architecture based on the provided parameters.
     It returns a compiled Keras model.
     """
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense
+
     model = Sequential()
     input_dim = X_scaled.shape[1]
     for _ in range(number_of_hidden_layers):
@@ -103,17 +120,22 @@ def model_definition(
     return model
 
 def train_the_model(
-    model: keras.Model,
+    model: "keras.Model",
     X_scaled: np.ndarray,
     y_scaled: np.ndarray,
     early_stopping_patience: int,
     epochs: int,
     batch_size: int,
-    validation_split: float
-) -> Tuple[float, float, keras.callbacks.History]:
+    validation_split: float,
+    callbacks: Optional[List["keras.callbacks.Callback"]] = None
+) -> Tuple[float, float, "keras.callbacks.History"]:
     """
     This function trains the model using the provided parameters and returns the RMSE and training history.
+    The given callbacks (e.g. progress reporting) run along with the early stopping.
     """
+    from tensorflow.keras.callbacks import EarlyStopping
+    from sklearn.metrics import r2_score
+
     early_stopping = EarlyStopping(monitor='val_loss', patience=early_stopping_patience, restore_best_weights=True)
     
     history = model.fit(
@@ -121,8 +143,8 @@ def train_the_model(
         epochs=epochs,
         batch_size=batch_size,
         validation_split=validation_split,
-        callbacks=[early_stopping],
-        verbose=1
+        callbacks=[early_stopping] + (callbacks or []),
+        verbose=0
     )
     
     # Calculate RMSE
@@ -140,24 +162,26 @@ def train_the_model(
 def store_model_in_db(
     db: Session,
     query_id: int,
-    model: keras.Model,
+    model: "keras.Model",
     no_of_hidden_layers: int,
     no_of_neurons_per_layer: int,
     early_stopping_patience: int,
     epochs: int,
     batch_size: int,
     validation_split: float,
-    scaler_x: StandardScaler,
-    scaler_y: StandardScaler,
+    scaler_x: "StandardScaler",
+    scaler_y: "StandardScaler",
     rmse: float,
-    r2_score: float
+    r2_score: float,
+    trial_leaderboard: Optional[List[Dict[str, Any]]] = None
 ) -> None:
     """
     This function stores the trained model, hyperparameters, and RMSE in the database.
+    A model found by a hyperparameter search is stored with the leaderboard of its best trials.
     """
     try:
-        # Serialize the model
-        model_bytes = pickle.dumps(model)
+        # Serialize the weights, the architecture and the scalers into a model artifact instead of pickling Keras objects
+        model_bytes = DenseNetwork.from_keras(model, scaler_x, scaler_y).to_bytes()
         
         # Create a new TrainedModel instance
         trained_model = TrainedModel(
@@ -169,8 +193,7 @@ def store_model_in_db(
             batch_size=batch_size,
             validation_split=validation_split,
             model_data=model_bytes,
-            scaler_x=pickle.dumps(scaler_x),
-            scaler_y=pickle.dumps(scaler_y),
+            trial_leaderboard=trial_leaderboard,
             rmse=rmse,
             r2_percentage=r2_score
         )
@@ -191,27 +214,17 @@ def train_model(
     epochs: int,
     batch_size: int,
     validation_split: float,
-    training_data: Any = None
-
+    training_data: Optional[BinaryIO] = None,
+    callbacks: Optional[List["keras.callbacks.Callback"]] = None
 ) -> ModelTrainingResponse:
     """
     This function is used to train a dedicated model for a specific time consuming query using
-    the provided parameters. It will train the model, store the model outputs, hyperparameters, and RMSE in the database, and 
+    the provided parameters, on the uploaded file or, without one, on the logged executions. It will train the model, store the model outputs, hyperparameters, and RMSE in the database, and 
     return the RMSE and  r2_score of the trained model. The utility functions have been defined above.
+    It blocks for the whole training, the API runs it as a background job (see app.workers.training_jobs).
     """
-    # Fetch the training data
-    df = get_training_data_from_file(training_data)
-    
-    # Create dataset
-    window_size = 10  # Example window size, can be adjusted
-    X_raw, y_raw = create_dataset(
-        df['delta'].tolist(),
-        df['sin_hour'].tolist(),
-        df['cos_hour'].tolist(),
-        df['sin_weekday'].tolist(),
-        df['cos_weekday'].tolist(),
-        window_size
-    )
+    # Fetch the training data and create the dataset
+    X_raw, y_raw = load_training_dataset(db, query_id, training_data)
     
     # Preprocess the data
     X_scaled, y_scaled, scaler_x, scaler_y = pre_processing(X_raw, y_raw)
@@ -227,7 +240,8 @@ def train_model(
         early_stopping_patience,
         epochs,
         batch_size,
-        validation_split
+        validation_split,
+        callbacks
     )
     
     # Store the model and its metadata in the database
@@ -278,3 +292,71 @@ def get_latest_trained_model_attributes(db: Session, query_id: int) -> ModelTrai
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching trained model attributes: {str(e)}")
 
+
+# Entry point function to get the statistics of the model cache used for scheduling
+def get_model_cache_stats() -> ModelCacheStatsResponse:
+    """
+    This function returns the size and the hit, miss and eviction counters of the in-memory model cache.
+    """
+    return ModelCacheStatsResponse(**model_cache.stats())
+
+
+# Entry point function to queue the training of a model for a time consuming query
+def submit_training_job(query_id: int, training_data: Optional[bytes], **parameters: Any) -> TrainingJobResponse:
+    """
+    This function queues a training job in the worker pool and returns its ID right away.
+    The job runs train_model in a worker process with the given hyperparameters.
+    """
+    job = training_jobs.submit("training", run_training_job, training_data, {"query_id": query_id, **parameters})
+    return TrainingJobResponse(job_id=job.job_id, status=job.status)
+
+# Entry point function to queue a hyperparameter search for a time consuming query
+def submit_search_job(request: HyperparameterSearchRequest, training_data: Optional[bytes]) -> TrainingJobResponse:
+    """
+    This function validates the search space and queues a hyperparameter search job. The job trains the trials
+    in parallel and stores only the best model, with the leaderboard of the best trials.
+    """
+    candidates = {
+        "number_of_hidden_layers": request.number_of_hidden_layers,
+        "number_of_neurons_per_layer": request.number_of_neurons_per_layer,
+        "batch_size": request.batch_size
+    }
+    for name, values in candidates.items():
+        if not values or min(values) < 1:
+            raise HTTPException(status_code=400, detail=f"{name} needs at least one candidate value, all of them positive.")
+    if request.max_trials < 1 or request.epochs < 1:
+        raise HTTPException(status_code=400, detail="max_trials and epochs must be positive.")
+    # The trials are ranked by their validation loss, so they need a validation set
+    if not 0 < request.validation_split < 1:
+        raise HTTPException(status_code=400, detail="validation_split must be between 0 and 1, exclusive.")
+
+    space = search_space(request.number_of_hidden_layers, request.number_of_neurons_per_layer, request.batch_size)
+    if request.strategy == "grid" and len(space) > request.max_trials:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The grid has {len(space)} configurations, more than max_trials ({request.max_trials}). Use random search or successive halving."
+        )
+
+    job = training_jobs.submit("search", run_search_job, training_data, request.model_dump())
+    return TrainingJobResponse(job_id=job.job_id, status=job.status)
+
+# Entry point function to get the status of a training job
+def get_training_job_status(job_id: str) -> TrainingJobStatusResponse:
+    """
+    This function returns the progress of a training job and the metrics of its model once it finished.
+    """
+    return training_jobs.status(job_id)
+
+# Entry point function to list the training jobs
+def list_training_jobs() -> TrainingJobListResponse:
+    """
+    This function returns the status of the queued, running and recently finished training jobs.
+    """
+    return TrainingJobListResponse(jobs=training_jobs.list_jobs())
+
+# Entry point function to cancel a training job
+def cancel_training_job(job_id: str) -> TrainingJobStatusResponse:
+    """
+    This function cancels a queued or running training job. A running job stops at the end of its current epoch.
+    """
+    return training_jobs.cancel(job_id)
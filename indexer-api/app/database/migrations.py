@@ -0,0 +1,75 @@
+import pickle
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.utils.numpy_inference import ARTIFACT_MAGIC, DenseNetwork
+
+logger = logging.getLogger(__name__)
+
+# create_all only creates missing tables. These statements bring the tables of existing databases up to date.
+# Every statement must be idempotent since they run on each start.
+MIGRATIONS = [
+    # Source position of the query logs, used to make the log ingestion idempotent
+    "ALTER TABLE query_logs ADD COLUMN IF NOT EXISTS source_file VARCHAR",
+    "ALTER TABLE query_logs ADD COLUMN IF NOT EXISTS source_offset BIGINT",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_query_logs_source ON query_logs (tc_query_id, time_stamp, source_file, source_offset)",
+    # Executions a query log stands for, the pg_stat_statements sampler writes a capped number of rows per sample
+    "ALTER TABLE query_logs ADD COLUMN IF NOT EXISTS calls BIGINT NOT NULL DEFAULT 1",
+    # Exported weights of the trained models for the NumPy inference runtime
+    "ALTER TABLE trained_models ADD COLUMN IF NOT EXISTS inference_data BYTEA",
+    # Best trials of the hyperparameter search that produced a model
+    "ALTER TABLE trained_models ADD COLUMN IF NOT EXISTS trial_leaderboard JSON",
+    # The model artifact in model_data holds the scaler parameters, the pickled scalers are only kept for unconverted rows
+    "ALTER TABLE trained_models ALTER COLUMN scaler_x DROP NOT NULL",
+    "ALTER TABLE trained_models ALTER COLUMN scaler_y DROP NOT NULL",
+    # Rows that could not be converted to a model artifact, they are not tried again on every start
+    "ALTER TABLE trained_models ADD COLUMN IF NOT EXISTS conversion_failed BOOLEAN NOT NULL DEFAULT false",
+]
+
+UNCONVERTED_MODELS_SQL = "SELECT id FROM trained_models WHERE substring(model_data FROM 1 FOR 4) <> :magic AND NOT conversion_failed ORDER BY id"
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Apply the schema migrations to the database of the given engine.
+    """
+    with engine.begin() as connection:
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
+
+    convert_trained_models(engine)
+
+def convert_trained_models(engine: Engine) -> None:
+    """
+    Convert the trained models stored as pickled Keras objects to model artifacts, one transaction per row.
+    Rows with exported npz weights convert without TensorFlow. Rows with only the pickled model need it to be
+    unpickled. If that fails they keep their pickled form and are flagged with conversion_failed, so a start
+    doesn't import TensorFlow again for them. Clear the flag to retry them, e.g. after installing TensorFlow.
+    """
+    with engine.connect() as connection:
+        model_ids = connection.execute(text(UNCONVERTED_MODELS_SQL), {"magic": ARTIFACT_MAGIC}).scalars().all()
+    if not model_ids:
+        return
+
+    converted = 0
+    for model_id in model_ids:
+        with engine.begin() as connection:
+            row = connection.execute(
+                text("SELECT model_data, scaler_x, scaler_y, inference_data FROM trained_models WHERE id = :id"),
+                {"id": model_id}
+            ).fetchone()
+            try:
+                if row.inference_data is not None:
+                    network = DenseNetwork.from_bytes(row.inference_data)
+                else:
+                    network = DenseNetwork.from_keras(pickle.loads(row.model_data), pickle.loads(row.scaler_x), pickle.loads(row.scaler_y))
+            except Exception:
+                logger.warning("Could not convert trained model %d to a model artifact, it keeps its pickled form", model_id, exc_info=True)
+                connection.execute(text("UPDATE trained_models SET conversion_failed = true WHERE id = :id"), {"id": model_id})
+                continue
+
+            connection.execute(
+                text("UPDATE trained_models SET model_data = :model_data, scaler_x = NULL, scaler_y = NULL, inference_data = NULL WHERE id = :id"),
+                {"model_data": network.to_bytes(), "id": model_id}
+            )
+            converted += 1
+    logger.info("Converted %d of %d trained models to model artifacts", converted, len(model_ids))
@@ -1,18 +1,42 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from app.routes import health_check_routes, dba_routes, diagnostics_routes, statistics_routes, model_trainer_routes, adim_routes, hits_routes, workload_simulator_routes, manual_labor_routes
 from app.database.base import Base
 from app.database.session import b_plus_engine
-from app.models import tc_query, query_log, trained_models, index_maintenance_log
+from app.database.migrations import run_migrations
+from app.config.settings import settings
+from app.workers.ingestion_worker import run_ingestion_worker
+from app.workers.training_jobs import training_jobs
+from app.models import tc_query, query_log, trained_models, index_maintenance_log, log_file_checkpoint, ingestion_batch, statement_counter, index_build
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
+# Show the info logs of the app modules (e.g. ingestion throughput) next to the uvicorn logs
+logging.basicConfig(level=logging.INFO)
+
 # Create the database tables if they don't exist
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # This runs before the app starts
     Base.metadata.create_all(bind=b_plus_engine)
+    run_migrations(b_plus_engine)
+
+    # Start the log ingestion worker in the background
+    stop_event = asyncio.Event()
+    worker = asyncio.create_task(run_ingestion_worker(stop_event)) if settings.INGESTION_WORKER_ENABLED else None
+    # Start the training workers' manager process off the event loop, so the first training request doesn't wait for it
+    await asyncio.to_thread(training_jobs.start)
+
     yield
 
+    # This runs when the app shuts down. Let the current ingestion pass finish.
+    stop_event.set()
+    if worker:
+        await worker
+    # Stop the training workers, running trainings stop at the end of their epoch
+    await asyncio.to_thread(training_jobs.shutdown)
+
 app = FastAPI(title="Indexer API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware to allow requests from the frontend
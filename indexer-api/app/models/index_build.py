@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Float, TIMESTAMP, ForeignKey, func
+from app.database.base import Base
+
+class IndexBuild(Base):
+    __tablename__ = "index_builds"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    tc_query_id = Column(Integer, ForeignKey("tc_queries.id", ondelete="CASCADE"), nullable=False, index=True)
+    index_name = Column(String, nullable=False)
+    table_name = Column(String, nullable=False)
+    # Size of the table and of the index keys when the index was built
+    relpages = Column(BigInteger, nullable=False)
+    reltuples = Column(Float, nullable=False)
+    key_width = Column(Integer, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    built_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
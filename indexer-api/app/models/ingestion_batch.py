@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, BigInteger, String, TIMESTAMP, func
+from app.database.base import Base
+
+class IngestionBatch(Base):
+    __tablename__ = "ingestion_batches"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    source_file = Column(String, nullable=False, index=True)
+    inode = Column(BigInteger, nullable=False)
+    start_offset = Column(BigInteger, nullable=False)
+    end_offset = Column(BigInteger, nullable=False)
+    entries = Column(Integer, nullable=False)
+    ingested_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
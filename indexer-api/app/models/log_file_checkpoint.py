@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, BigInteger, TIMESTAMP, func
+from app.database.base import Base
+
+class LogFileCheckpoint(Base):
+    __tablename__ = "log_file_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    filename = Column(String, unique=True, nullable=False)
+    inode = Column(BigInteger, nullable=False)
+    byte_offset = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, Boolean, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, TIMESTAMP, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database.base import Base
 
 class QueryLog(Base):
     __tablename__ = "query_logs"
+    # An execution is identified by its query, its time and the log position it was read from, so re-ingesting a log is a no-op
+    __table_args__ = (
+        UniqueConstraint("tc_query_id", "time_stamp", "source_file", "source_offset", name="uq_query_logs_source"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     tc_query_id = Column(Integer, ForeignKey("tc_queries.id", ondelete="CASCADE"), nullable=False)
     time_stamp = Column(TIMESTAMP, nullable=False)
     optimized = Column(Boolean, default=False)
+    source_file = Column(String, nullable=True)
+    source_offset = Column(BigInteger, nullable=True)
+    # Number of executions the row stands for, more than 1 for the capped samples of pg_stat_statements
+    calls = Column(BigInteger, nullable=False, default=1, server_default="1")
 
     # Defining the relationship with TCQuery
-    tc_query = relationship("TCQuery", back_populates="query_logs")
\ No newline at end of file
+    tc_query = relationship("TCQuery", back_populates="query_logs")
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, TIMESTAMP, ForeignKey, UniqueConstraint
+from app.database.base import Base
+
+class StatementCounter(Base):
+    __tablename__ = "statement_counters"
+    # The last pg_stat_statements calls counter seen for a statement of a time consuming query
+    __table_args__ = (
+        UniqueConstraint("tc_query_id", "queryid", name="uq_statement_counters_query"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    tc_query_id = Column(Integer, ForeignKey("tc_queries.id", ondelete="CASCADE"), nullable=False)
+    queryid = Column(BigInteger, nullable=False)
+    calls = Column(BigInteger, nullable=False)
+    sampled_at = Column(TIMESTAMP, nullable=False)
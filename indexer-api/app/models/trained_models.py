@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, TIMESTAMP, LargeBinary, ForeignKey, func
+from sqlalchemy import Column, Integer, Float, Boolean, TIMESTAMP, LargeBinary, JSON, ForeignKey, func, false
 from sqlalchemy.orm import relationship
 from app.database.base import Base
 
@@ -13,9 +13,18 @@ class TrainedModel(Base):
     epochs = Column(Integer, nullable=False)
     batch_size = Column(Integer, nullable=False)
     validation_split = Column(Float, nullable=False)
+    # Model artifact with the layer weights, the architecture and the scaler parameters (see DenseNetwork.to_bytes).
+    # Rows the startup migration couldn't convert still hold the pickled Keras model.
     model_data = Column(LargeBinary, nullable=False)
-    scaler_x = Column(LargeBinary, nullable=False)
-    scaler_y = Column(LargeBinary, nullable=False)
+    # Pickled StandardScalers of unconverted rows, the artifact holds the scaler parameters
+    scaler_x = Column(LargeBinary, nullable=True)
+    scaler_y = Column(LargeBinary, nullable=True)
+    # Exported weights as an npz archive of unconverted rows
+    inference_data = Column(LargeBinary, nullable=True)
+    # The startup migration failed to convert the row, it isn't tried again
+    conversion_failed = Column(Boolean, nullable=False, server_default=false())
+    # The best trials of the hyperparameter search that produced the model, None for a single training
+    trial_leaderboard = Column(JSON, nullable=True)
     rmse = Column(Float, nullable=False)
     r2_percentage = Column(Float, nullable=False)
     created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
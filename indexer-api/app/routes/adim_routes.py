@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Depends
-from app.controllers.adim_controller import get_adim_schedules, create_index_using_query_id
-from app.schemas.adim import ADIMScheduleResponse, CreateIndexRequest
+from app.controllers.adim_controller import get_adim_schedules, create_index_using_query_id, create_indexes_using_query_ids
+from app.schemas.adim import ADIMScheduleResponse, CreateIndexRequest, BulkCreateIndexRequest, BulkCreateIndexResponse
 from app.database.session import get_b_plus_db, get_org_db
 from app.middleware.auth import auth_wrapper
 
 router = APIRouter()
 
 @router.get("/adim/schedules", response_model=ADIMScheduleResponse, tags=["ADIM Schedules"], dependencies=[Depends(auth_wrapper)])
-async def adim_schedules_endpoint(db_org=Depends(get_org_db), db_b_plus=Depends(get_b_plus_db)):
+async def adim_schedules_endpoint(db_b_plus=Depends(get_b_plus_db)):
     """
     Endpoint to retrieve ADIM schedules.
-    Returns a JSON response with the schedules.
+    Returns a JSON response with the schedules precomputed by the ingestion worker.
     """
-    return get_adim_schedules(db_org, db_b_plus)
+    return get_adim_schedules(db_b_plus)
     # Return a sample response for testing purposes
     # return ADIMScheduleResponse(
     #     schedules=[
@@ -28,9 +28,17 @@ async def adim_schedules_endpoint(db_org=Depends(get_org_db), db_b_plus=Depends(
     # )
 
 @router.post("/adim/create_index", tags=["ADIM Schedules"], dependencies=[Depends(auth_wrapper)])
-async def create_index_endpoint(request: CreateIndexRequest, db_org=Depends(get_org_db), db_b_plus=Depends(get_b_plus_db)):
+def create_index_endpoint(request: CreateIndexRequest, db_org=Depends(get_org_db), db_b_plus=Depends(get_b_plus_db)):
     """
     Endpoint to create an index using a query ID.
     Accepts a JSON request body with the query ID.
     """
-    return create_index_using_query_id(db_org=db_org, db_b_plus=db_b_plus, tc_query_id=request.tc_query_id)
\ No newline at end of file
+    return create_index_using_query_id(db_org=db_org, db_b_plus=db_b_plus, tc_query_id=request.tc_query_id)
+
+@router.post("/adim/create_indexes", response_model=BulkCreateIndexResponse, tags=["ADIM Schedules"], dependencies=[Depends(auth_wrapper)])
+def create_indexes_endpoint(request: BulkCreateIndexRequest, db_org=Depends(get_org_db), db_b_plus=Depends(get_b_plus_db)):
+    """
+    Endpoint to create the indexes of several queries at once.
+    Accepts a JSON request body with the query IDs and returns the result and timings of every query.
+    """
+    return create_indexes_using_query_ids(db_org=db_org, db_b_plus=db_b_plus, tc_query_ids=request.tc_query_ids)
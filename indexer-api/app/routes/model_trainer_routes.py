@@ -1,30 +1,35 @@
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
-from app.controllers.model_trainer_controller import train_model, get_latest_trained_model_attributes
+from app.controllers.model_trainer_controller import submit_training_job, submit_search_job, get_training_job_status, list_training_jobs, cancel_training_job, get_latest_trained_model_attributes, get_model_cache_stats
 from app.database.session import get_b_plus_db
 from app.middleware.auth import auth_wrapper
-from app.schemas.model_trainer import ModelTrainingResponse, ModelTrainingRequestForFetchAttributes, ModelTrainingResponseForFetchAttributes
+from app.schemas.model_trainer import HyperparameterSearchRequest, TrainingJobResponse, TrainingJobStatusResponse, TrainingJobListResponse, ModelTrainingRequestForFetchAttributes, ModelTrainingResponseForFetchAttributes, ModelCacheStatsResponse
 
 router = APIRouter()
 
 # Check the dependency between using_files and training_data
+# Without files the training data is read from the logged executions of the query
 def validate_training_data(using_files: bool, training_data: UploadFile | None):
-    if not using_files:
+    if using_files and not training_data:
         raise HTTPException(
             status_code=400,
-            detail="The system still does not support fetching training data from the database."
+            detail="Training data file is required when using_files is True"
         )
 
-    if using_files and not training_data:
+
+# Parse the comma separated candidate values of a hyperparameter
+def parse_candidates(name: str, value: str) -> List[int]:
+    try:
+        return [int(candidate) for candidate in value.split(",") if candidate.strip()]
+    except ValueError:
         raise HTTPException(
             status_code=400,
-            detail="Training data file is required when using_files is True"
+            detail=f"{name} must be a comma separated list of integers"
         )
-    
 
 # Here we could not use pydantic model since we need to handle file uploads. Hence the other attributes were also taken as form data for simplicity. 
-@router.post("/train_model", response_model=ModelTrainingResponse, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
+@router.post("/train_model", response_model=TrainingJobResponse, status_code=202, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
 async def train_model_endpoint(
-    db=Depends(get_b_plus_db),
     query_id: int = Form(..., description="ID of the query to train the model for"),
     number_of_hidden_layers: int = Form(..., description="Number of hidden layers in the model"),
     number_of_neurons_per_layer: int = Form(..., description="Number of neurons per layer in the model"),
@@ -32,28 +37,88 @@ async def train_model_endpoint(
     epochs: int = Form(..., description="Number of epochs for training"),
     batch_size: int = Form(..., description="Batch size for training"),
     validation_split: float = Form(..., description="Validation split ratio for training"),
-    using_files: bool = Form(False, description="Whether to use files for training data"),
+    using_files: bool = Form(False, description="Whether to use files for training data, otherwise the logged executions are used"),
     training_data: UploadFile = File(None, description="Training data file (optional, required if using_files is True)")
 ):
     """
     Endpoint to train a dedicated model for a specific time-consuming query.
-    Returns the RMSE of the trained model.
+    Queues the training and returns the job ID, the RMSE of the trained model is reported by the job status.
     """
 
     # Validate the training data based on the using_files flag
     validate_training_data(using_files, training_data)
 
-    return train_model(
-        db=db,
+    return submit_training_job(
         query_id=query_id,
+        training_data=await training_data.read() if using_files else None,
         number_of_hidden_layers=number_of_hidden_layers,
         number_of_neurons_per_layer=number_of_neurons_per_layer,
         early_stopping_patience=early_stopping_patience,
         epochs=epochs,
         batch_size=batch_size,
+        validation_split=validation_split
+    )
+
+# Like /train_model, the search takes form data because of the file upload. The candidate values are comma separated.
+@router.post("/train_model/search", response_model=TrainingJobResponse, status_code=202, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
+async def hyperparameter_search_endpoint(
+    query_id: int = Form(..., description="ID of the query to train the model for"),
+    strategy: Literal["grid", "random", "successive_halving"] = Form("random", description="Search strategy"),
+    number_of_hidden_layers: str = Form(..., description="Candidate numbers of hidden layers, e.g. 1,2,3"),
+    number_of_neurons_per_layer: str = Form(..., description="Candidate numbers of neurons per layer, e.g. 16,32,64"),
+    batch_size: str = Form(..., description="Candidate batch sizes, e.g. 16,32"),
+    early_stopping_patience: int = Form(..., description="Early stopping patience of every trial"),
+    epochs: int = Form(..., description="Number of epochs of a trial (of the last round for successive halving)"),
+    validation_split: float = Form(..., description="Validation split ratio, the trials are ranked by their validation loss"),
+    max_trials: int = Form(20, description="Number of configurations to try (the largest grid allowed for grid search)"),
+    seed: Optional[int] = Form(None, description="Seed of the configuration sampling"),
+    using_files: bool = Form(False, description="Whether to use files for training data, otherwise the logged executions are used"),
+    training_data: UploadFile = File(None, description="Training data file (optional, required if using_files is True)")
+):
+    """
+    Endpoint to search the hyperparameters of the model of a time-consuming query.
+    Queues the search and returns the job ID. Only the best model is stored, the job status reports the leaderboard.
+    """
+
+    # Validate the training data based on the using_files flag
+    validate_training_data(using_files, training_data)
+
+    request = HyperparameterSearchRequest(
+        query_id=query_id,
+        strategy=strategy,
+        number_of_hidden_layers=parse_candidates("number_of_hidden_layers", number_of_hidden_layers),
+        number_of_neurons_per_layer=parse_candidates("number_of_neurons_per_layer", number_of_neurons_per_layer),
+        batch_size=parse_candidates("batch_size", batch_size),
+        early_stopping_patience=early_stopping_patience,
+        epochs=epochs,
         validation_split=validation_split,
-        training_data=training_data
+        max_trials=max_trials,
+        seed=seed
     )
+    return submit_search_job(request, await training_data.read() if using_files else None)
+
+# These endpoints are used to follow and cancel the training jobs.
+@router.get("/train_model/jobs", response_model=TrainingJobListResponse, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
+async def training_jobs_endpoint():
+    """
+    Endpoint to list the queued, running and recently finished training jobs.
+    """
+    return list_training_jobs()
+
+@router.get("/train_model/jobs/{job_id}", response_model=TrainingJobStatusResponse, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
+async def training_job_status_endpoint(job_id: str):
+    """
+    Endpoint to fetch the status of a training job.
+    Returns the finished epochs and the last loss while it runs, and the RMSE and R² of the model once it succeeded.
+    """
+    return get_training_job_status(job_id)
+
+@router.delete("/train_model/jobs/{job_id}", response_model=TrainingJobStatusResponse, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
+async def cancel_training_job_endpoint(job_id: str):
+    """
+    Endpoint to cancel a queued or running training job. A running job stops at the end of its current epoch.
+    """
+    return cancel_training_job(job_id)
 
 # This endpoint is used to get the existing model attributes for a specific query ID.
 @router.post("/fetch_model_attributes", response_model=ModelTrainingResponseForFetchAttributes, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
@@ -67,6 +132,11 @@ async def fetch_model_attributes_endpoint(
     """
     return get_latest_trained_model_attributes(db=db, query_id=request.query_id)
 
-
-
-
+# This endpoint is used to monitor the cache of deserialized models used by the scheduler.
+@router.get("/model_cache/stats", response_model=ModelCacheStatsResponse, tags=["Model Training"], dependencies=[Depends(auth_wrapper)])
+async def model_cache_stats_endpoint():
+    """
+    Endpoint to fetch the model cache statistics.
+    Returns the cache size and the hit, miss and eviction counters.
+    """
+    return get_model_cache_stats()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 class Schedules(BaseModel):
     """
@@ -20,3 +20,40 @@ class CreateIndexRequest(BaseModel):
     Represents the request body for creating an index using a query ID.
     """
     tc_query_id: int
+
+
+class BulkCreateIndexRequest(BaseModel):
+    """
+    Represents the request body for creating the indexes of several queries at once.
+    """
+    tc_query_ids: List[int]
+
+class IndexCreationResult(BaseModel):
+    """
+    Represents the outcome of a single CREATE INDEX statement.
+    """
+    index_name: str
+    command: str
+    success: bool
+    # The index already existed, so nothing was built
+    skipped: bool
+    duration_seconds: float
+    attempts: int
+    error: Optional[str] = None
+
+class QueryIndexCreationResult(BaseModel):
+    """
+    Represents the outcome of the index creation of one query in a bulk request.
+    """
+    tc_query_id: int
+    success: bool
+    detail: Optional[str] = None
+    duration_seconds: float
+    indexes: List[IndexCreationResult]
+
+class BulkCreateIndexResponse(BaseModel):
+    """
+    Represents the response of the bulk index creation endpoint.
+    """
+    results: List[QueryIndexCreationResult]
+    duration_seconds: float
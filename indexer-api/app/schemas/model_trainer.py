@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Literal, Optional
 
 class ModelTrainingResponse(BaseModel):
     rmse: float
@@ -16,4 +18,66 @@ class ModelTrainingResponseForFetchAttributes(BaseModel):
     validation_split: float
     rmse: float
     r2_percentage: float
-    created_at: str
\ No newline at end of file
+    created_at: str
+
+class ModelCacheStatsResponse(BaseModel):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+
+class TrainingJobResponse(BaseModel):
+    job_id: str
+    status: str
+
+class SearchTrialResult(BaseModel):
+    number_of_hidden_layers: int
+    number_of_neurons_per_layer: int
+    batch_size: int
+    epochs: int
+    val_loss: float
+    rmse: float
+    r2_percentage: float
+
+class TrainingJobStatusResponse(BaseModel):
+    job_id: str
+    # training or search
+    kind: str
+    query_id: int
+    # queued, running, cancelling, succeeded, failed or cancelled
+    status: str
+    # Number of finished epochs and the losses of the last one
+    epoch: int
+    epochs: int
+    loss: Optional[float] = None
+    val_loss: Optional[float] = None
+    # Metrics of the stored model, set once the job succeeded
+    rmse: Optional[float] = None
+    r2_score: Optional[float] = None
+    # Progress of a hyperparameter search and its best trials once it succeeded
+    trials_finished: Optional[int] = None
+    trials: Optional[int] = None
+    leaderboard: Optional[List[SearchTrialResult]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class TrainingJobListResponse(BaseModel):
+    jobs: List[TrainingJobStatusResponse]
+
+class HyperparameterSearchRequest(BaseModel):
+    query_id: int
+    strategy: Literal["grid", "random", "successive_halving"]
+    # Candidate values of every hyperparameter
+    number_of_hidden_layers: List[int]
+    number_of_neurons_per_layer: List[int]
+    batch_size: List[int]
+    early_stopping_patience: int
+    # Epochs of a trial, the last round of successive halving trains with this many
+    epochs: int
+    validation_split: float
+    # Number of configurations tried by random search and successive halving, and the largest grid allowed
+    max_trials: int
+    seed: Optional[int] = None
@@ -0,0 +1,49 @@
+import numpy as np
+from typing import Iterator, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.query_log import QueryLog
+from app.utils.window_dataset import TIME_FEATURE_COUNT, timestamp_features
+from app.config.settings import settings
+
+TRAINING_FETCH_CHUNK_SIZE = settings.TRAINING_FETCH_CHUNK_SIZE
+
+def iter_timestamp_chunks(db: Session, tc_query_id: int, chunk_size: int = TRAINING_FETCH_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Stream the execution timestamps of a query in time order as datetime64[us] chunks.
+    The rows come from a server-side cursor as plain tuples, so neither the whole result nor ORM objects
+    are ever held in memory.
+    """
+    # The options apply to this statement only, the connection of the session is left as it is
+    result = db.execute(
+        select(QueryLog.time_stamp)
+        .where(QueryLog.tc_query_id == tc_query_id)
+        .order_by(QueryLog.time_stamp),
+        execution_options={"stream_results": True, "yield_per": chunk_size}
+    )
+    try:
+        for rows in result.partitions():
+            yield np.array([row[0] for row in rows], dtype="datetime64[us]")
+    finally:
+        result.close()
+
+def fetch_execution_series(db: Session, tc_query_id: int, chunk_size: int = TRAINING_FETCH_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the training series of a query from its logged executions: the inter-arrival deltas in seconds
+    and the cyclic features of the execution that ends each delta. The first execution has no delta.
+    Deltas and features are computed chunk by chunk, the previous chunk's last timestamp links them.
+    """
+    delta_chunks: List[np.ndarray] = []
+    feature_chunks: List[np.ndarray] = []
+    previous = None
+    for timestamps in iter_timestamp_chunks(db, tc_query_id, chunk_size):
+        linked = timestamps if previous is None else np.concatenate(([previous], timestamps))
+        previous = timestamps[-1]
+        if len(linked) < 2:
+            continue
+        delta_chunks.append(np.diff(linked) / np.timedelta64(1, "s"))
+        feature_chunks.append(timestamp_features(linked[1:]))
+
+    if not delta_chunks:
+        return np.empty(0), np.empty((0, TIME_FEATURE_COUNT))
+    return np.concatenate(delta_chunks), np.concatenate(feature_chunks)
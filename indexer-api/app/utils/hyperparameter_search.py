@@ -0,0 +1,154 @@
+import random
+import logging
+import tempfile
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+HYPERPARAMETER_SEARCH_MAX_PARALLEL_TRIALS = settings.HYPERPARAMETER_SEARCH_MAX_PARALLEL_TRIALS
+HYPERPARAMETER_SEARCH_LEADERBOARD_SIZE = settings.HYPERPARAMETER_SEARCH_LEADERBOARD_SIZE
+
+# Successive halving keeps the best 1/ETA of the configurations after every round and gives them ETA times the epochs
+SUCCESSIVE_HALVING_ETA = 3
+
+class TrialConfig(NamedTuple):
+    """The hyperparameters of a search trial."""
+    number_of_hidden_layers: int
+    number_of_neurons_per_layer: int
+    batch_size: int
+
+class TrialResult(NamedTuple):
+    """The outcome of a trained trial. The weights are kept to store the best model without training it again."""
+    config: TrialConfig
+    epochs: int
+    val_loss: float
+    rmse: float
+    r2_percentage: float
+    weights: List[np.ndarray]
+
+    def leaderboard_entry(self) -> Dict[str, Any]:
+        return {**self.config._asdict(), "epochs": self.epochs, "val_loss": self.val_loss, "rmse": self.rmse, "r2_percentage": self.r2_percentage}
+
+def search_space(number_of_hidden_layers: List[int], number_of_neurons_per_layer: List[int], batch_size: List[int]) -> List[TrialConfig]:
+    """Every combination of the candidate values."""
+    return [TrialConfig(*values) for values in itertools.product(number_of_hidden_layers, number_of_neurons_per_layer, batch_size)]
+
+def sample_configs(space: List[TrialConfig], max_trials: int, seed: Optional[int]) -> List[TrialConfig]:
+    """Draw up to max_trials distinct configurations of the search space."""
+    return random.Random(seed).sample(space, min(max_trials, len(space)))
+
+def halving_rounds(configs: int, epochs: int) -> List[Tuple[int, int]]:
+    """The (configurations, epochs) of every successive halving round, the last round trains with the full epochs."""
+    # The number of times the configurations can be cut to 1/ETA, counted on integers since float logs of exact powers
+    # of ETA round down (math.log(243, 3) < 5)
+    rounds = 0
+    while configs // SUCCESSIVE_HALVING_ETA ** (rounds + 1) >= 1:
+        rounds += 1
+    return [
+        (max(1, configs // SUCCESSIVE_HALVING_ETA ** round_number), max(1, epochs // SUCCESSIVE_HALVING_ETA ** (rounds - round_number)))
+        for round_number in range(rounds + 1)
+    ]
+
+# The dataset and the cancellation flag of the trial worker processes, set by init_trial_worker
+_X_scaled: Optional[np.ndarray] = None
+_y_scaled: Optional[np.ndarray] = None
+_cancelled: Any = None
+_job_id: Optional[str] = None
+
+def init_trial_worker(dataset_dir: str, cancelled: Any, job_id: str) -> None:
+    """Map the shared preprocessed dataset once per trial worker process."""
+    global _X_scaled, _y_scaled, _cancelled, _job_id
+    _X_scaled = np.load(Path(dataset_dir) / "X_scaled.npy", mmap_mode="r")
+    _y_scaled = np.load(Path(dataset_dir) / "y_scaled.npy", mmap_mode="r")
+    _cancelled = cancelled
+    _job_id = job_id
+
+def run_trial(config: TrialConfig, epochs: int, early_stopping_patience: int, validation_split: float) -> TrialResult:
+    """Train the model of a configuration on the shared dataset, in a trial worker process."""
+    from tensorflow.keras.callbacks import LambdaCallback
+    from app.controllers.model_trainer_controller import model_definition, train_the_model
+    from app.workers.training_jobs import TrainingCancelled
+
+    def stop_if_cancelled(epoch: int, logs: Dict[str, float]) -> None:
+        if _job_id in _cancelled:
+            raise TrainingCancelled()
+
+    X_scaled, y_scaled = np.asarray(_X_scaled), np.asarray(_y_scaled)
+    model = model_definition(config.number_of_hidden_layers, config.number_of_neurons_per_layer, X_scaled)
+    rmse, r2_percentage, history = train_the_model(
+        model, X_scaled, y_scaled, early_stopping_patience, epochs, config.batch_size, validation_split,
+        callbacks=[LambdaCallback(on_epoch_end=stop_if_cancelled)]
+    )
+    # The early stopping restores the weights of the best epoch, which is the one the trials are ranked by
+    return TrialResult(config, epochs, float(min(history.history["val_loss"])), float(rmse), float(r2_percentage), model.get_weights())
+
+def run_search(
+    X_scaled: np.ndarray,
+    y_scaled: np.ndarray,
+    strategy: str,
+    space: List[TrialConfig],
+    max_trials: int,
+    epochs: int,
+    early_stopping_patience: int,
+    validation_split: float,
+    cancelled: Any,
+    job_id: str,
+    on_trial: Callable[[int, int, TrialResult], None],
+    seed: Optional[int] = None
+) -> List[TrialResult]:
+    """
+    Run the trials of a search over the preprocessed dataset in a pool of worker processes and return all results.
+    The dataset is written once to a temporary directory and memory mapped by every worker.
+    on_trial(finished, total, result) is called after every trial.
+    """
+    # The configurations of the first round and the (configurations, epochs) of every round
+    configs = space if strategy == "grid" else sample_configs(space, max_trials, seed)
+    rounds = halving_rounds(len(configs), epochs) if strategy == "successive_halving" else [(len(configs), epochs)]
+    total = sum(round_configs for round_configs, _ in rounds)
+
+    results: List[TrialResult] = []
+    with tempfile.TemporaryDirectory(prefix="hyperparameter_search_") as dataset_dir:
+        np.save(Path(dataset_dir) / "X_scaled.npy", X_scaled)
+        np.save(Path(dataset_dir) / "y_scaled.npy", y_scaled)
+
+        with ProcessPoolExecutor(
+            max_workers=HYPERPARAMETER_SEARCH_MAX_PARALLEL_TRIALS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_trial_worker,
+            initargs=(dataset_dir, cancelled, job_id)
+        ) as executor:
+            candidates = configs
+            for round_number, (_, round_epochs) in enumerate(rounds):
+                logger.info("Search %s: training %d configurations for %d epochs", job_id, len(candidates), round_epochs)
+                futures = [
+                    executor.submit(run_trial, config, round_epochs, early_stopping_patience, validation_split)
+                    for config in candidates
+                ]
+                round_results = []
+                try:
+                    for future in as_completed(futures):
+                        result = future.result()
+                        round_results.append(result)
+                        results.append(result)
+                        on_trial(len(results), total, result)
+                except BaseException:
+                    # Don't start the queued trials of a failed or cancelled search
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+
+                # The best configurations of the round go on to the next one
+                if round_number + 1 < len(rounds):
+                    round_results.sort(key=lambda result: result.val_loss)
+                    candidates = [result.config for result in round_results[:rounds[round_number + 1][0]]]
+    return results
+
+def leaderboard(results: List[TrialResult]) -> List[Dict[str, Any]]:
+    """The best trials by validation loss, without their weights."""
+    ranked = sorted(results, key=lambda result: result.val_loss)
+    return [result.leaderboard_entry() for result in ranked[:HYPERPARAMETER_SEARCH_LEADERBOARD_SIZE]]
@@ -0,0 +1,81 @@
+import re
+import sys
+import argparse
+import subprocess
+from typing import List, NamedTuple
+
+# A line of python -X importtime: "import time:   self [us] | cumulative | imported package"
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Packages that must stay out of the API startup, they are imported on the first training or ingestion
+DEFAULT_FORBIDDEN_PACKAGES = ["tensorflow", "keras", "pandas", "sklearn"]
+
+class ImportTime(NamedTuple):
+    """The import time of a module in microseconds."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+def measure_import_times(module: str) -> List[ImportTime]:
+    """Import the module in a fresh interpreter with -X importtime and parse the timings."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    import_times = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            import_times.append(ImportTime(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors))
+    return import_times
+
+def main() -> int:
+    """
+    Print the slowest imports of the API startup and fail if it imports a forbidden package or exceeds a budget.
+    Usage: python -m app.utils.import_report [--module app.main] [--top 20] [--budget-ms 2000]
+    """
+    parser = argparse.ArgumentParser(description="Report the import time of the indexer API.")
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest imports to show")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the total import time exceeds this many ms")
+    parser.add_argument(
+        "--forbid",
+        default=",".join(DEFAULT_FORBIDDEN_PACKAGES),
+        help="Comma separated packages that must not be imported (empty to allow all)"
+    )
+    args = parser.parse_args()
+
+    import_times = measure_import_times(args.module)
+    # The top level imports add up to the total, nested ones are already part of their parent's cumulative time
+    total_us = sum(import_time.cumulative_us for import_time in import_times if import_time.depth == 0)
+
+    print(f"Importing {args.module} took {total_us / 1000:.1f} ms ({len(import_times)} modules)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for import_time in sorted(import_times, key=lambda import_time: import_time.cumulative_us, reverse=True)[:args.top]:
+        print(f"{import_time.cumulative_us / 1000:>14.1f} {import_time.self_us / 1000:>9.1f}  {import_time.module}")
+
+    failed = False
+    forbidden = [package for package in args.forbid.split(",") if package]
+    imported = sorted({
+        import_time.module for import_time in import_times
+        if import_time.module.split(".")[0] in forbidden
+    })
+    if imported:
+        top_level = sorted({module.split(".")[0] for module in imported})
+        print(f"Forbidden packages imported at startup: {', '.join(top_level)}")
+        failed = True
+
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"Import time {total_us / 1000:.1f} ms exceeds the budget of {args.budget_ms:.1f} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
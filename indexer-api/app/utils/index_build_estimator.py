@@ -0,0 +1,198 @@
+import re
+import math
+import statistics
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.index_build import IndexBuild
+
+# Cost model of a btree build: a sequential scan of the heap followed by a sort of the index tuples.
+# The defaults are rough figures for a small server, they are calibrated with the measured builds.
+SECONDS_PER_HEAP_PAGE = 1e-4
+SECONDS_PER_SORTED_BYTE = 5e-9
+# Per tuple overhead of an index entry (item pointer and header) added to the key width
+INDEX_TUPLE_OVERHEAD = 16
+# Key width assumed for expressions and columns without statistics
+DEFAULT_COLUMN_WIDTH = 8
+
+# The measured builds used to calibrate the cost model
+MIN_CALIBRATION_BUILDS = 3
+MAX_CALIBRATION_BUILDS = 50
+
+CREATE_INDEX_PATTERN = re.compile(
+    r"create\s+(?:unique\s+)?index\s+(?:concurrently\s+)?(?:if\s+not\s+exists\s+)?([\w\"]+)\s+"
+    r"on\s+(?:only\s+)?([\w.\"]+)(?:\s+using\s+\w+)?\s*\(",
+    re.IGNORECASE
+)
+# A plain column of the key list, unquoted or quoted
+IDENTIFIER_PATTERN = re.compile(r"^(?:\w+|\"(?:[^\"]|\"\")+\")$")
+# A part of a possibly schema qualified name, quoted (with doubled quotes inside) or not
+NAME_PART_PATTERN = re.compile(r"\"((?:[^\"]|\"\")*)\"|([^.\"]+)")
+
+TABLE_STATS_SQL = """
+    SELECT GREATEST(c.relpages, pg_relation_size(c.oid) / current_setting('block_size')::bigint) AS relpages,
+           GREATEST(c.reltuples, 0) AS reltuples,
+           n.nspname AS schema_name,
+           c.relname AS relation_name
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.oid = to_regclass(:table_name)
+"""
+COLUMN_WIDTHS_SQL = """
+    SELECT attname, avg_width
+    FROM pg_stats
+    WHERE schemaname = :schema_name AND tablename = :table_name
+"""
+
+class IndexDefinition(NamedTuple):
+    """The parts of a CREATE INDEX statement the cost model needs."""
+    index_name: str
+    table_name: str
+    columns: List[str]
+    # The table name with every part quoted, to_regclass resolves it as written in the statement
+    quoted_table_name: str
+
+def split_qualified_name(name: str) -> List[str]:
+    """
+    Split a possibly schema qualified name at the dots outside of quotes.
+    Quoted parts keep their case, unquoted ones are folded to lower case like PostgreSQL does.
+    """
+    return [
+        quoted.replace('""', '"') if quoted is not None else unquoted.lower()
+        for quoted, unquoted in ((match.group(1), match.group(2)) for match in NAME_PART_PATTERN.finditer(name))
+    ]
+
+def quote_qualified_name(parts: List[str]) -> str:
+    """Quote and join the parts of a name split by split_qualified_name."""
+    return ".".join('"' + part.replace('"', '""') + '"' for part in parts)
+
+class IndexBuildStats(NamedTuple):
+    """The size of an index build."""
+    index_name: str
+    table_name: str
+    relpages: int
+    reltuples: float
+    key_width: int
+
+def parse_index_definition(command: str) -> Optional[IndexDefinition]:
+    """Extract the index name, the table and the key columns of a CREATE INDEX statement."""
+    match = CREATE_INDEX_PATTERN.search(command)
+    if not match:
+        return None
+
+    # Split the key list at the top level commas, expressions may contain parentheses and commas themselves
+    columns, depth, current = [], 1, ""
+    for char in command[match.end():]:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        if char == "," and depth == 1:
+            columns.append(current.strip())
+            current = ""
+        else:
+            current += char
+    columns.append(current.strip())
+
+    table_parts = split_qualified_name(match.group(2))
+    return IndexDefinition(
+        match.group(1).strip('"'),
+        ".".join(table_parts),
+        [column for column in columns if column],
+        quote_qualified_name(table_parts)
+    )
+
+def model_seconds(relpages: int, reltuples: float, key_width: int) -> float:
+    """Build time of the uncalibrated cost model."""
+    sort_bytes = reltuples * math.log2(max(reltuples, 2.0)) * (key_width + INDEX_TUPLE_OVERHEAD)
+    return relpages * SECONDS_PER_HEAP_PAGE + sort_bytes * SECONDS_PER_SORTED_BYTE
+
+class IndexBuildEstimator:
+    """
+    Estimates how long the indexes of a query take to build from the size of their tables in pg_class,
+    the widths of their key columns in pg_stats and the durations of past builds.
+    Table statistics are cached, so create one estimator per scheduling pass.
+    """
+
+    def __init__(self, db_org: Session, db_b_plus: Session) -> None:
+        self.db_org = db_org
+        self.db_b_plus = db_b_plus
+        self.table_stats: Dict[str, tuple] = {}
+        self.column_widths: Dict[str, Dict[str, int]] = {}
+        self.calibration: Optional[float] = None
+
+    def calibration_factor(self) -> float:
+        """
+        The median ratio between the measured and the modelled duration of the latest builds.
+        The median keeps a single build that waited on a lock from skewing the estimates.
+        """
+        builds = self.db_b_plus.query(IndexBuild).order_by(IndexBuild.built_at.desc()).limit(MAX_CALIBRATION_BUILDS).all()
+        ratios = [
+            build.duration_seconds / modelled
+            for build in builds
+            if (modelled := model_seconds(build.relpages, build.reltuples, build.key_width)) > 0
+        ]
+        if len(ratios) < MIN_CALIBRATION_BUILDS:
+            return 1.0
+        return statistics.median(ratios)
+
+    def build_stats(self, command: str) -> Optional[IndexBuildStats]:
+        """Collect the size of the build of a CREATE INDEX statement, None if it can't be parsed or the table is missing."""
+        definition = parse_index_definition(command)
+        if definition is None:
+            return None
+
+        table_name = definition.table_name
+        if table_name not in self.table_stats:
+            row = self.db_org.execute(text(TABLE_STATS_SQL), {"table_name": definition.quoted_table_name}).fetchone()
+            self.table_stats[table_name] = (int(row.relpages), float(row.reltuples)) if row else None
+            # The statistics of the table the name resolved to, not of same named tables in other schemas
+            self.column_widths[table_name] = {
+                column.attname: int(column.avg_width)
+                for column in self.db_org.execute(
+                    text(COLUMN_WIDTHS_SQL), {"schema_name": row.schema_name, "table_name": row.relation_name}
+                ).fetchall()
+            } if row else {}
+            # End the read transaction right away, concurrent index builds wait for transactions with older snapshots
+            self.db_org.rollback()
+        if self.table_stats[table_name] is None:
+            return None
+
+        relpages, reltuples = self.table_stats[table_name]
+        key_width = 0
+        for column in definition.columns:
+            # Drop the ordering options, only a plain column has statistics
+            name = re.split(r"\s+(?:asc|desc|nulls)\b", column, flags=re.IGNORECASE)[0].strip()
+            identifier = IDENTIFIER_PATTERN.match(name)
+            # Fold the name like PostgreSQL does, unquoted identifiers are stored in lower case
+            column_name = split_qualified_name(name)[0] if identifier else None
+            key_width += self.column_widths[table_name].get(column_name, DEFAULT_COLUMN_WIDTH)
+
+        return IndexBuildStats(definition.index_name, table_name, relpages, reltuples, key_width)
+
+    def estimate(self, commands: List[str]) -> float:
+        """Estimate the seconds it takes to build the given indexes one after another."""
+        if self.calibration is None:
+            self.calibration = self.calibration_factor()
+        seconds = 0.0
+        for command in commands:
+            stats = self.build_stats(command)
+            if stats is not None:
+                seconds += model_seconds(stats.relpages, stats.reltuples, stats.key_width) * self.calibration
+        return seconds
+
+def record_index_build(db_b_plus: Session, tc_query_id: int, stats: Optional[IndexBuildStats], duration_seconds: float) -> None:
+    """Add a measured build to the session, it calibrates the estimates of the next scheduling passes."""
+    if stats is None:
+        return
+    db_b_plus.add(IndexBuild(
+        tc_query_id=tc_query_id,
+        index_name=stats.index_name,
+        table_name=stats.table_name,
+        relpages=stats.relpages,
+        reltuples=stats.reltuples,
+        key_width=stats.key_width,
+        duration_seconds=duration_seconds
+    ))
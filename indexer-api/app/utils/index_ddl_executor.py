@@ -0,0 +1,239 @@
+import re
+import time
+import random
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from app.config.settings import settings
+from app.utils.index_build_estimator import IndexBuildEstimator, parse_index_definition, record_index_build
+
+logger = logging.getLogger(__name__)
+
+DDL_LOCK_TIMEOUT_MS = settings.DDL_LOCK_TIMEOUT_MS
+DDL_MAX_RETRIES = settings.DDL_MAX_RETRIES
+DDL_RETRY_BACKOFF_SECONDS = settings.DDL_RETRY_BACKOFF_SECONDS
+DDL_MAX_PARALLEL_TABLES = settings.DDL_MAX_PARALLEL_TABLES
+
+# SQLSTATE of lock_not_available, raised when lock_timeout expires
+LOCK_NOT_AVAILABLE = "55P03"
+
+CREATE_INDEX_PREFIX_PATTERN = re.compile(
+    r"^\s*create\s+(unique\s+)?index\s+(?:concurrently\s+)?(?:if\s+not\s+exists\s+)?",
+    re.IGNORECASE
+)
+# Quoted identifiers and literals are case sensitive, everything else of a statement is not
+QUOTED_PART_PATTERN = re.compile(r"(\"[^\"]*\"|'[^']*')|[^\"']+")
+
+INVALID_INDEX_SQL = """
+    SELECT 1
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :index_name AND NOT i.indisvalid
+"""
+EXISTING_INDEX_SQL = "SELECT 1 FROM pg_class WHERE relname = :index_name AND relkind = 'i'"
+
+class IndexDDLResult(NamedTuple):
+    """The outcome of a CREATE or DROP INDEX statement."""
+    index_name: str
+    command: str
+    success: bool
+    duration_seconds: float
+    attempts: int
+    error: Optional[str] = None
+    # The index already existed, so nothing was built
+    skipped: bool = False
+
+def to_concurrent_create(command: str) -> str:
+    """Rewrite a CREATE INDEX statement to CREATE INDEX CONCURRENTLY IF NOT EXISTS."""
+    statement = command.strip().rstrip(";")
+    return CREATE_INDEX_PREFIX_PATTERN.sub(
+        lambda match: f"CREATE {'UNIQUE ' if match.group(1) else ''}INDEX CONCURRENTLY IF NOT EXISTS ",
+        statement,
+        count=1
+    )
+
+def is_lock_timeout(error: DBAPIError) -> bool:
+    """Return True if the statement failed because lock_timeout expired."""
+    return getattr(error.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+class IndexDDLExecutor:
+    """
+    Creates and drops indexes without blocking writes on the organization tables.
+    The statements run CONCURRENTLY in autocommit mode (they can't run in a transaction) with a lock_timeout,
+    so a statement that waits behind a long transaction gives up and is retried with an exponential backoff
+    instead of queueing every writer behind it. A failed concurrent build leaves an INVALID index behind,
+    which is dropped before the next attempt.
+    lock_timeout also bounds the waits of CREATE INDEX CONCURRENTLY for the transactions older than the build,
+    which happen after the table lock is taken, some of them after the full scan. A lock timeout that leaves
+    an INVALID index behind expired in one of these waits, so the next attempt runs without lock_timeout:
+    the waits don't block writers, and the build doesn't fail after every scan while a long transaction runs.
+    Builds on different tables run in parallel, builds on the same table one after another.
+    """
+
+    def __init__(self, engine: Engine, max_parallel_tables: int = DDL_MAX_PARALLEL_TABLES) -> None:
+        self.engine = engine
+        self.max_parallel_tables = max_parallel_tables
+
+    def execute(self, connection: Connection, statement: str, lock_timeout: bool = True) -> None:
+        """Run a statement under the lock timeout and reset it, the connection goes back to the pool afterwards."""
+        if not lock_timeout:
+            connection.execute(text(statement))
+            return
+        connection.execute(text(f"SET lock_timeout = {int(DDL_LOCK_TIMEOUT_MS)}"))
+        try:
+            connection.execute(text(statement))
+        finally:
+            connection.execute(text("RESET lock_timeout"))
+
+    def has_invalid_index(self, connection: Connection, index_name: str) -> bool:
+        """Return True if a failed concurrent build left the index INVALID."""
+        return connection.execute(text(INVALID_INDEX_SQL), {"index_name": index_name}).fetchone() is not None
+
+    def drop_invalid_index(self, connection: Connection, index_name: str) -> None:
+        """Drop the index if a failed concurrent build left it INVALID."""
+        if self.has_invalid_index(connection, index_name):
+            logger.warning("Dropping invalid index %s left by a failed build", index_name)
+            self.execute(connection, f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    def run_with_retries(self, index_name: str, command: str, statement: str, cleanup: bool) -> IndexDDLResult:
+        """Run a DDL statement, retrying lock timeouts with an exponential backoff."""
+        started = time.perf_counter()
+        error = None
+        lock_timeout = True
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for attempt in range(1, DDL_MAX_RETRIES + 2):
+                try:
+                    if cleanup:
+                        self.drop_invalid_index(connection, index_name)
+                        if connection.execute(text(EXISTING_INDEX_SQL), {"index_name": index_name}).fetchone():
+                            return IndexDDLResult(index_name, command, True, 0.0, attempt, skipped=True)
+                    attempt_started = time.perf_counter()
+                    self.execute(connection, statement, lock_timeout)
+                    return IndexDDLResult(index_name, command, True, time.perf_counter() - attempt_started, attempt)
+                except DBAPIError as e:
+                    error = str(e.orig)
+                    if not is_lock_timeout(e) or attempt > DDL_MAX_RETRIES:
+                        break
+                    # The build got past the table lock and timed out waiting for older transactions
+                    if cleanup and lock_timeout and self.has_invalid_index(connection, index_name):
+                        logger.info("Build of %s timed out waiting for older transactions, retrying without lock timeout", index_name)
+                        lock_timeout = False
+                    backoff = DDL_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                    logger.info("Lock timeout on %s, retrying in %.1f s", index_name, backoff)
+                    time.sleep(backoff)
+
+            # Leave no INVALID index behind, it would slow down writes without ever being used
+            if cleanup:
+                try:
+                    self.drop_invalid_index(connection, index_name)
+                except DBAPIError:
+                    logger.exception("Failed to drop the invalid index %s", index_name)
+        return IndexDDLResult(index_name, command, False, time.perf_counter() - started, attempt, error)
+
+    def create_indexes(self, commands: List[str]) -> List[IndexDDLResult]:
+        """Create the indexes of the given CREATE INDEX statements and return the results in the same order."""
+        by_table: Dict[str, List[int]] = defaultdict(list)
+        for position, command in enumerate(commands):
+            definition = parse_index_definition(command)
+            # A statement that can't be parsed gets its own group, it can't be told apart from other tables
+            by_table[definition.table_name if definition else f"#{position}"].append(position)
+
+        results: List[Optional[IndexDDLResult]] = [None] * len(commands)
+
+        def create_table_indexes(positions: List[int]) -> None:
+            for position in positions:
+                command = commands[position]
+                definition = parse_index_definition(command)
+                if definition is None:
+                    results[position] = IndexDDLResult("", command, False, 0.0, 0, "Not a CREATE INDEX statement")
+                    continue
+                results[position] = self.run_with_retries(definition.index_name, command, to_concurrent_create(command), cleanup=True)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_parallel_tables, len(by_table)))) as executor:
+            list(executor.map(create_table_indexes, by_table.values()))
+        return results
+
+    def drop_indexes(self, index_names: List[str]) -> List[IndexDDLResult]:
+        """Drop the given indexes one after another."""
+        return [
+            self.run_with_retries(index_name, f"DROP INDEX {index_name}", f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}", cleanup=False)
+            for index_name in index_names
+        ]
+
+def statement_key(command: str) -> str:
+    """
+    The statement a CREATE INDEX command runs, with the whitespace collapsed and the unquoted parts in lower case,
+    so identical builds compare equal.
+    """
+    return QUOTED_PART_PATTERN.sub(
+        lambda match: match.group(1) or match.group(0).lower(),
+        " ".join(to_concurrent_create(command).split())
+    )
+
+def create_indexes_for_queries(db_org: Session, db_b_plus: Session, commands_by_query: Dict[int, List[str]]) -> Dict[int, List[IndexDDLResult]]:
+    """
+    Create the indexes of several time consuming queries in one pass and record the measured builds.
+    A statement shared by several queries is built once, its result is reported to every query that uses it.
+    Returns the results of every query in the order of its commands, nothing is raised for failed builds.
+    """
+    # Deduplicate the statements, a build is recorded for the first query that uses it
+    unique_commands: Dict[str, str] = {}
+    owners: Dict[str, int] = {}
+    for tc_query_id, commands in commands_by_query.items():
+        for command in commands:
+            key = statement_key(command)
+            if key not in unique_commands:
+                unique_commands[key] = command
+                owners[key] = tc_query_id
+
+    # Collect the table sizes before building, they calibrate the build time estimates together with the durations
+    estimator = IndexBuildEstimator(db_org, db_b_plus)
+    keys = list(unique_commands)
+    commands = [unique_commands[key] for key in keys]
+    stats = [estimator.build_stats(command) for command in commands]
+
+    results = dict(zip(keys, IndexDDLExecutor(db_org.get_bind()).create_indexes(commands)))
+    for key, build_stats in zip(keys, stats):
+        if results[key].success and not results[key].skipped:
+            record_index_build(db_b_plus, owners[key], build_stats, results[key].duration_seconds)
+    db_b_plus.commit()
+
+    return {
+        tc_query_id: [results[statement_key(command)] for command in commands]
+        for tc_query_id, commands in commands_by_query.items()
+    }
+
+def create_query_indexes(db_org: Session, db_b_plus: Session, tc_query_id: int, commands: List[str]) -> List[IndexDDLResult]:
+    """
+    Create the indexes of a time consuming query without blocking writes and record the measured builds.
+    Raises an HTTPException listing the indexes that could not be created.
+    """
+    results = create_indexes_for_queries(db_org, db_b_plus, {tc_query_id: commands})[tc_query_id]
+
+    failed = [result for result in results if not result.success]
+    if failed:
+        raise HTTPException(
+            status_code=500,
+            detail="Error creating index: " + "; ".join(f"{result.index_name or result.command}: {result.error}" for result in failed)
+        )
+    return results
+
+def drop_query_indexes(db_org: Session, index_names: List[str]) -> None:
+    """
+    Drop indexes without blocking writes.
+    Raises an HTTPException listing the indexes that could not be dropped.
+    """
+    # Don't keep a transaction open, DROP INDEX CONCURRENTLY waits for the transactions that use the table
+    db_org.rollback()
+    failed = [result for result in IndexDDLExecutor(db_org.get_bind()).drop_indexes(index_names) if not result.success]
+    if failed:
+        raise HTTPException(
+            status_code=500,
+            detail="Error dropping index: " + "; ".join(f"{result.index_name}: {result.error}" for result in failed)
+        )
@@ -0,0 +1,229 @@
+import re
+import csv
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Tuple
+
+# Start of a line that opens a new log entry (used to find safe cut points in a chunk)
+LOG_ENTRY_BOUNDARY_PATTERN = re.compile(rb"\n(?=\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)")
+
+# File extension PostgreSQL uses for each log_destination
+LOG_FILE_EXTENSIONS = {
+    "stderr": ".log",
+    "csvlog": ".csv",
+    "jsonlog": ".json",
+}
+
+# Positions of the used csvlog columns (see "Using CSV-Format Log Output" in the PostgreSQL docs)
+CSVLOG_LOG_TIME = 0
+CSVLOG_ERROR_SEVERITY = 11
+CSVLOG_MESSAGE = 13
+
+STATEMENT_PREFIX = "statement: "
+
+def find_last_entry_boundary(chunk: bytes) -> int:
+    """
+    Return the number of leading bytes of the chunk that only contain complete log entries.
+    The entry that starts at the last timestamped line may still have continuation lines
+    after the chunk, so everything from that line onwards is held back.
+    """
+    last_boundary = 0
+    for match in LOG_ENTRY_BOUNDARY_PATTERN.finditer(chunk):
+        last_boundary = match.start() + 1
+    return last_boundary
+
+def find_last_csv_record_boundary(chunk: bytes) -> int:
+    """
+    Return the number of leading bytes of the chunk that only contain complete csvlog records.
+    Quoted fields may contain new lines, so a new line is a record boundary only if it is outside
+    of quotes, i.e. preceded by an even number of quote characters.
+    """
+    for match in reversed(list(LOG_ENTRY_BOUNDARY_PATTERN.finditer(chunk))):
+        boundary = match.start() + 1
+        if chunk.count(b'"', 0, boundary) % 2 == 0:
+            return boundary
+    return 0
+
+def find_last_line_boundary(chunk: bytes) -> int:
+    """
+    Return the number of leading bytes of the chunk that only contain complete jsonlog records.
+    Every record is a single line since new lines inside JSON strings are escaped.
+    """
+    return chunk.rfind(b"\n") + 1
+    
+def parse_log_content(content: str) -> List[Dict[str, Any]]:
+    """
+    Parse the PostgreSQL log file and extract user queries.
+    Only entries that do not contain internal system references (like "pg_catalog")
+    are retained. The position of an entry is the offset of its first line in the content.
+    """
+    user_entries: List[Dict[str, Any]] = []
+    current_entry: Dict[str, Any] = {}
+    collecting_query = False
+    query_lines: List[str] = []
+
+    # Match timestamp + statement line
+    stmt_pattern = re.compile(
+        r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+ (?:[+\-]\d{4}|[A-Z]+)) \[.*?\] LOG:\s+statement:\s+(.*)$"
+    )
+
+    # Match start of a new log line to stop query collection
+    new_log_entry_pattern = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+")
+
+    position = 0
+    for line in content.split("\n"):
+        line_position = position
+        position += len(line) + 1
+        line = line.rstrip()
+
+        stmt_match = stmt_pattern.match(line)
+        if stmt_match:
+            # Save previous collected query
+            if current_entry and query_lines:
+                current_entry["query_text"] = "\n".join(query_lines).strip()
+                if 'pg_catalog' not in current_entry["query_text"].lower():
+                    user_entries.append(current_entry)
+
+            # Start new entry
+            current_entry = {
+                "timestamp": stmt_match.group(1),
+                "position": line_position,
+            }
+            query_lines = [stmt_match.group(2)]
+            collecting_query = True
+        elif collecting_query:
+            # If line starts like a new timestamped log, stop collecting
+            if new_log_entry_pattern.match(line):
+                # Save current before resetting
+                current_entry["query_text"] = "\n".join(query_lines).strip()
+                if 'pg_catalog' not in current_entry["query_text"].lower():
+                    user_entries.append(current_entry)
+                collecting_query = False
+                query_lines = []
+                current_entry = {}
+            else:
+                # It's a continuation line
+                query_lines.append(line.strip())
+
+    # Append last query if still collecting at EOF
+    if collecting_query and current_entry and query_lines:
+        current_entry["query_text"] = "\n".join(query_lines).strip()
+        if 'pg_catalog' not in current_entry["query_text"].lower():
+            user_entries.append(current_entry)
+
+    return user_entries
+
+def parse_csvlog_content(content: str) -> List[Dict[str, Any]]:
+    """
+    Parse PostgreSQL csvlog output and extract user queries.
+    The timestamp and the statement are taken straight from the record fields, so statements may contain
+    any text, including new lines and timestamps. The position of an entry is the offset of its record in the content.
+    """
+    lines = content.split("\n")
+    line_positions = [0]
+    for line in lines:
+        line_positions.append(line_positions[-1] + len(line) + 1)
+
+    user_entries: List[Dict[str, Any]] = []
+    reader = csv.reader(line + "\n" for line in lines)
+    while True:
+        # line_num counts the lines consumed so far, so it points at the first line of the next record
+        position = line_positions[reader.line_num]
+        record = next(reader, None)
+        if record is None:
+            break
+        if len(record) <= CSVLOG_MESSAGE or record[CSVLOG_ERROR_SEVERITY] != "LOG":
+            continue
+        message = record[CSVLOG_MESSAGE]
+        if not message.startswith(STATEMENT_PREFIX):
+            continue
+        query_text = message[len(STATEMENT_PREFIX):].strip()
+        if 'pg_catalog' not in query_text.lower():
+            user_entries.append({"timestamp": record[CSVLOG_LOG_TIME], "query_text": query_text, "position": position})
+    return user_entries
+
+def parse_jsonlog_content(content: str) -> List[Dict[str, Any]]:
+    """
+    Parse PostgreSQL jsonlog output and extract user queries.
+    Every line is one JSON record, the timestamp and the statement are taken from its fields.
+    The position of an entry is the offset of its line in the content.
+    """
+    user_entries: List[Dict[str, Any]] = []
+    position = 0
+    for line in content.split("\n"):
+        line_position = position
+        position += len(line) + 1
+        # Skip the records that cannot be statements without decoding them
+        if STATEMENT_PREFIX not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        message = record.get("message", "")
+        if record.get("error_severity") != "LOG" or not message.startswith(STATEMENT_PREFIX):
+            continue
+        query_text = message[len(STATEMENT_PREFIX):].strip()
+        if 'pg_catalog' not in query_text.lower():
+            user_entries.append({"timestamp": record["timestamp"], "query_text": query_text, "position": line_position})
+    return user_entries
+
+# Parser and chunk boundary finder of each supported log format
+LOG_PARSERS: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {
+    "stderr": parse_log_content,
+    "csvlog": parse_csvlog_content,
+    "jsonlog": parse_jsonlog_content,
+}
+BOUNDARY_FINDERS: Dict[str, Callable[[bytes], int]] = {
+    "stderr": find_last_entry_boundary,
+    "csvlog": find_last_csv_record_boundary,
+    "jsonlog": find_last_line_boundary,
+}
+
+def to_utf8(text: str) -> str:
+    """Decode text that was read byte by byte as latin-1 back to UTF-8."""
+    try:
+        return text.encode("latin-1").decode("utf-8", errors="replace")
+    except UnicodeEncodeError:
+        # Characters above U+00FF can only come from JSON escapes, the text is already decoded
+        return text
+
+def parse_log_chunk(chunk: bytes, log_format: str = "stderr", chunk_offset: int = 0) -> List[Tuple[str, str, int]]:
+    """
+    Parse a chunk of complete log entries into compact (timestamp, query_text, byte_offset) tuples.
+    The byte offset of an entry is its position in the log file, given the offset of the chunk.
+    The chunk is decoded as latin-1, which maps every byte to one character, so the positions reported by the parsers
+    are byte offsets. Only the extracted query texts are decoded as UTF-8.
+    This runs in the worker processes of the parallel ingestion, so it only depends on this module.
+    """
+    return [
+        (entry["timestamp"], to_utf8(entry["query_text"]), chunk_offset + entry["position"])
+        for entry in LOG_PARSERS[log_format](chunk.decode("latin-1"))
+    ]
+
+def iter_complete_chunks(stream: BinaryIO, length: int, chunk_size: int, is_rotated: bool, log_format: str = "stderr", offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """
+    Read length bytes of a log stream in chunks of about chunk_size bytes that only contain complete log entries.
+    Yields the chunks with their offset in the file, given the offset the stream starts at.
+    The incomplete tail of a chunk is carried over to the next one. The tail of the last chunk is held back
+    unless the file is rotated, since the active file may still be appending to its last entry.
+    """
+    remaining = length
+    carry = b""
+    while remaining > 0:
+        chunk = stream.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+
+        buffer = carry + chunk
+        if remaining == 0 and is_rotated:
+            # Nothing will be appended to a rotated file, so its last entry is complete
+            consumable = len(buffer)
+        else:
+            # The last entry of the chunk may continue in the next chunk, or is still being written
+            consumable = BOUNDARY_FINDERS[log_format](buffer)
+
+        carry = buffer[consumable:]
+        if consumable:
+            yield offset, buffer[:consumable]
+            offset += consumable
@@ -0,0 +1,178 @@
+import os
+import shlex
+import subprocess
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, List, NamedTuple, Tuple
+from fastapi import HTTPException
+from app.config.settings import settings
+from app.utils.log_parser import LOG_FILE_EXTENSIONS
+
+#constants
+LOG_DIR = "/logs"
+IS_DEV = settings.IS_DEV_MODE
+VOLUME_NAME = "pg-org-logs"
+LOG_FILE_EXTENSION = LOG_FILE_EXTENSIONS[settings.LOG_FORMAT]
+LOG_STREAM_SKIP_SIZE = 1 << 20
+
+class LogFile(NamedTuple):
+    """A PostgreSQL log file in the log volume."""
+    filename: str
+    inode: int
+    size: int
+
+class LogVolume(ABC):
+    """
+    Access to the PostgreSQL log files of the configured log format.
+    Every operation works on a batch of files, so a backend can serve a whole ingestion pass with a constant number of calls.
+    """
+
+    @abstractmethod
+    def list_log_files(self) -> List[LogFile]:
+        """List the log files with their inode and size."""
+
+    @abstractmethod
+    def open_log_files(self, ranges: List[Tuple[str, int, int]]) -> Iterator[Tuple[str, BinaryIO]]:
+        """
+        Open the (filename, offset, size) byte ranges of the given log files in order.
+        Yields the filename and a stream positioned at the offset. The caller reads at most size - offset bytes.
+        """
+
+    @abstractmethod
+    def delete_log_files(self, filenames: List[str]) -> None:
+        """Delete the given log files."""
+
+class FileSystemLogVolume(LogVolume):
+    """Log files of a volume mounted into the API container."""
+
+    def list_log_files(self) -> List[LogFile]:
+        log_files = []
+        for filename in os.listdir(LOG_DIR):
+            if not filename.endswith(LOG_FILE_EXTENSION):
+                continue
+            stat = os.stat(os.path.join(LOG_DIR, filename))
+            log_files.append(LogFile(filename, stat.st_ino, stat.st_size))
+        return log_files
+
+    def open_log_files(self, ranges: List[Tuple[str, int, int]]) -> Iterator[Tuple[str, BinaryIO]]:
+        for filename, offset, _ in ranges:
+            with open(os.path.join(LOG_DIR, filename), "rb") as f:
+                f.seek(offset)
+                yield filename, f
+
+    def delete_log_files(self, filenames: List[str]) -> None:
+        for filename in filenames:
+            os.remove(os.path.join(LOG_DIR, filename))
+
+class BoundedStream:
+    """Reads at most length bytes of a stream, the byte range of one log file in the output of a container."""
+
+    def __init__(self, stream: BinaryIO, length: int) -> None:
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        data = self.stream.read(self.remaining if size is None or size < 0 else min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def skip(self) -> None:
+        """Skip the bytes the reader left, so the stream is positioned at the next range."""
+        while self.remaining > 0:
+            if not self.read(LOG_STREAM_SKIP_SIZE):
+                raise EOFError("The log stream ended in the middle of a range")
+
+class DockerLogVolume(LogVolume):
+    """
+    Log files of a docker volume that is not mounted into the API (dev mode).
+    Each batch operation runs in a single alpine container, so a pass costs three container startups
+    regardless of the number of files. The pending byte ranges are streamed out one after another,
+    each preceded by a line with its length and file name, without being copied inside the container.
+    """
+
+    def container_command(self, script: str) -> List[str]:
+        """Build the command that runs a shell script in a throwaway container with the log volume mounted."""
+        return [
+            "docker", "run", "--rm",
+            "-v", f"{VOLUME_NAME}:/logs",
+            "alpine", "sh", "-c", script
+        ]
+
+    def run_in_container(self, script: str) -> subprocess.CompletedProcess:
+        """Run a shell script in a throwaway container and capture its output."""
+        return subprocess.run(self.container_command(script), capture_output=True, text=True)
+
+    def list_log_files(self) -> List[LogFile]:
+        result = self.run_in_container(f"cd /logs && for f in *{LOG_FILE_EXTENSION}; do [ -f \"$f\" ] && stat -c '%i %s %n' \"$f\"; done; true")
+        if result.returncode != 0:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error fetching log files: {result.stderr.strip()}"
+            )
+        log_files = []
+        for line in result.stdout.strip().split("\n"):
+            if not line:
+                continue
+            inode, size, filename = line.split(" ", 2)
+            log_files.append(LogFile(filename, int(inode), int(size)))
+        return log_files
+
+    def open_log_files(self, ranges: List[Tuple[str, int, int]]) -> Iterator[Tuple[str, BinaryIO]]:
+        if not ranges:
+            return
+
+        # Stream the pending byte range of every file straight out. The length is clamped to the current size
+        # of the file, which may have been rotated away since it was listed.
+        commands = ["cd /logs"]
+        for filename, offset, size in ranges:
+            quoted = shlex.quote(filename)
+            commands.append(f"size=$(stat -c %s {quoted} 2>/dev/null || echo 0)")
+            commands.append(f"length=$(( size > {offset} ? (size < {size} ? size : {size}) - {offset} : 0 ))")
+            commands.append(f"printf '%s %s\\n' \"$length\" {quoted}")
+            commands.append(f"tail -c +{offset + 1} {quoted} 2>/dev/null | head -c \"$length\"")
+
+        process = subprocess.Popen(self.container_command("\n".join(commands)), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        completed = False
+        try:
+            for _ in ranges:
+                length, _, filename = process.stdout.readline().decode(errors="replace").rstrip("\n").partition(" ")
+                if not length.isdigit():
+                    raise HTTPException(
+                        status_code=500,
+                        detail="Error reading log files: unexpected output of the log container"
+                    )
+                stream = BoundedStream(process.stdout, int(length))
+                yield filename, stream
+                stream.skip()
+            completed = True
+        except EOFError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error reading log files: {str(e)}"
+            )
+        finally:
+            # Stop the container if the reader stopped early or failed, then reap it either way
+            if not completed:
+                process.kill()
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors="replace").strip()
+            process.stderr.close()
+            returncode = process.wait()
+
+        if returncode != 0:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error reading log files: {stderr}"
+            )
+
+    def delete_log_files(self, filenames: List[str]) -> None:
+        if not filenames:
+            return
+        result = self.run_in_container("cd /logs && rm -f " + " ".join(shlex.quote(filename) for filename in filenames))
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to delete {', '.join(filenames)}: {result.stderr}")
+
+def get_log_volume() -> LogVolume:
+    """Return the log volume backend for the current mode."""
+    return DockerLogVolume() if IS_DEV else FileSystemLogVolume()
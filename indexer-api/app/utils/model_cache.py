@@ -0,0 +1,84 @@
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Tuple
+from app.models.trained_models import TrainedModel
+from app.utils.numpy_inference import DenseNetwork, is_artifact
+from app.config.settings import settings
+
+MODEL_CACHE_SIZE = settings.MODEL_CACHE_SIZE
+
+class LoadedModel(NamedTuple):
+    """A deserialized trained model with its scalers, ready to predict."""
+    tc_query_id: int
+    network: DenseNetwork
+
+def load_network(model_row: TrainedModel) -> DenseNetwork:
+    """
+    Load the NumPy network of a trained model row from its model artifact.
+    Rows the migration couldn't convert fall back to the exported npz weights or, without them, to the pickled
+    Keras model, which is unpickled (importing TensorFlow) once and converted.
+    """
+    if is_artifact(model_row.model_data):
+        return DenseNetwork.from_bytes(model_row.model_data)
+    if model_row.inference_data is not None:
+        return DenseNetwork.from_bytes(model_row.inference_data)
+    return DenseNetwork.from_keras(
+        pickle.loads(model_row.model_data),
+        pickle.loads(model_row.scaler_x),
+        pickle.loads(model_row.scaler_y)
+    )
+
+class ModelCache:
+    """
+    LRU cache of deserialized trained models.
+    Entries are keyed by the TrainedModel id and its created_at, so a replaced row is never served from the cache.
+    The models superseded by a newer one of their query are not looked up anymore and age out of the LRU order.
+    The cache is shared by the request threads and the ingestion worker thread, so every access holds a lock.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: "OrderedDict[Tuple[int, datetime], LoadedModel]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_row: TrainedModel) -> LoadedModel:
+        """Return the loaded model of a trained model row, deserializing it on a miss."""
+        key = (model_row.id, model_row.created_at)
+        with self.lock:
+            loaded = self.entries.get(key)
+            if loaded is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return loaded
+            self.misses += 1
+
+        # Deserialize outside the lock, a legacy Keras model takes a while to rebuild
+        loaded = LoadedModel(tc_query_id=model_row.tc_query_id, network=load_network(model_row))
+
+        with self.lock:
+            self.entries[key] = loaded
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return loaded
+
+    def stats(self) -> Dict[str, int]:
+        """Return the size and the hit, miss and eviction counters of the cache."""
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+# The cache of this process. When the ingestion worker runs as a separate process it has its own cache,
+# which still never serves a replaced model because of the (id, created_at) keys.
+model_cache = ModelCache(MODEL_CACHE_SIZE)
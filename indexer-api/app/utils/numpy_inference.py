@@ -0,0 +1,202 @@
+import io
+import json
+import time
+import zlib
+import struct
+import logging
+import numpy as np
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model artifact: a fixed prefix (magic, format version, flags, header length), a JSON header with the architecture
+# padded to a multiple of 8 bytes, then the payload: x_mean, x_scale, y_mean and y_scale as float64 followed by
+# the kernel and bias of every layer as float32, the dtype Keras trains them in. The payload is only zlib
+# compressed on request, an uncompressed one is loaded as views of the stored bytes.
+# Version 1 stored every array as float64 and compressed whenever that made the payload smaller.
+ARTIFACT_MAGIC = b"BPIM"
+ARTIFACT_VERSION = 2
+ARTIFACT_PREFIX = struct.Struct("<4sHHI")
+ARTIFACT_COMPRESSED = 1
+ARTIFACT_ALIGNMENT = 8
+
+def is_artifact(data: bytes) -> bool:
+    """Return True if the blob is a model artifact written by DenseNetwork.to_bytes."""
+    return data[:len(ARTIFACT_MAGIC)] == ARTIFACT_MAGIC
+
+# Activations of the Dense layers built by model_definition
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+}
+
+class DenseNetwork:
+    """
+    A trained interval model as plain NumPy arrays: the kernels, biases and activations of its Dense layers
+    and the parameters of its feature and target StandardScalers.
+    The forward pass is a few matmuls, so scheduling never has to import TensorFlow.
+    """
+
+    def __init__(
+        self,
+        kernels: List[np.ndarray],
+        biases: List[np.ndarray],
+        activations: List[str],
+        x_mean: np.ndarray,
+        x_scale: np.ndarray,
+        y_mean: np.ndarray,
+        y_scale: np.ndarray
+    ) -> None:
+        unknown = set(activations) - set(ACTIVATIONS)
+        if unknown:
+            raise ValueError(f"Unsupported activations: {', '.join(sorted(unknown))}")
+        self.kernels = kernels
+        self.biases = biases
+        self.activations = activations
+        self.x_mean = x_mean
+        self.x_scale = x_scale
+        self.y_mean = y_mean
+        self.y_scale = y_scale
+
+    @classmethod
+    def from_keras(cls, model: Any, scaler_x: Any, scaler_y: Any) -> "DenseNetwork":
+        """Export a Keras Sequential model of Dense layers and its fitted StandardScalers."""
+        kernels, biases, activations = [], [], []
+        for layer in model.layers:
+            kernel, bias = layer.get_weights()
+            kernels.append(np.asarray(kernel))
+            biases.append(np.asarray(bias))
+            activations.append(layer.get_config()["activation"])
+        return cls(
+            kernels,
+            biases,
+            activations,
+            np.asarray(scaler_x.mean_),
+            np.asarray(scaler_x.scale_),
+            np.asarray(scaler_y.mean_),
+            np.asarray(scaler_y.scale_)
+        )
+
+    def to_bytes(self, compress: bool = False) -> bytes:
+        """Serialize the network into a versioned model artifact, zlib compressed if requested."""
+        header = json.dumps({
+            "features": int(self.x_mean.shape[0]),
+            "layers": [list(kernel.shape) for kernel in self.kernels],
+            "activations": self.activations
+        }).encode()
+        # Pad the header so the float64 part of the payload starts aligned
+        header += b" " * (-(ARTIFACT_PREFIX.size + len(header)) % ARTIFACT_ALIGNMENT)
+        payload = (
+            np.concatenate([np.ravel(array).astype("<f8") for array in [self.x_mean, self.x_scale, self.y_mean, self.y_scale]]).tobytes()
+            + np.concatenate([
+                np.ravel(array).astype("<f4")
+                for kernel, bias in zip(self.kernels, self.biases) for array in (kernel, bias)
+            ]).tobytes()
+        )
+        flags = ARTIFACT_COMPRESSED if compress else 0
+        return (
+            ARTIFACT_PREFIX.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, flags, len(header))
+            + header
+            + (zlib.compress(payload) if compress else payload)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DenseNetwork":
+        """
+        Load a network from a model artifact, or from the npz archive written before the artifact format.
+        The arrays of an uncompressed artifact are views of np.frombuffer over the stored bytes. Nothing is unpickled.
+        """
+        if not is_artifact(data):
+            return cls.from_npz(data)
+
+        _, version, flags, header_length = ARTIFACT_PREFIX.unpack_from(data)
+        if version not in (1, ARTIFACT_VERSION):
+            raise ValueError(f"Unsupported model artifact version {version}")
+        header = json.loads(bytes(data[ARTIFACT_PREFIX.size:ARTIFACT_PREFIX.size + header_length]))
+        offset = ARTIFACT_PREFIX.size + header_length
+        if flags & ARTIFACT_COMPRESSED:
+            data, offset = zlib.decompress(memoryview(data)[offset:]), 0
+
+        features = header["features"]
+        scaler_size = 2 * features + 2
+        scalers = np.frombuffer(data, dtype="<f8", count=scaler_size, offset=offset)
+        offset += scaler_size * 8
+        weights = np.frombuffer(data, dtype="<f4" if version == ARTIFACT_VERSION else "<f8", offset=offset)
+
+        def take(values: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+            nonlocal position
+            size = int(np.prod(shape))
+            array = values[position:position + size].reshape(shape)
+            position += size
+            return array
+
+        position = 0
+        x_mean, x_scale, y_mean, y_scale = take(scalers, (features,)), take(scalers, (features,)), take(scalers, (1,)), take(scalers, (1,))
+        position = 0
+        kernels, biases = [], []
+        for rows, columns in header["layers"]:
+            kernels.append(take(weights, (rows, columns)))
+            biases.append(take(weights, (columns,)))
+        if position != len(weights):
+            raise ValueError("The model artifact payload doesn't match its header")
+        return cls(kernels, biases, header["activations"], x_mean, x_scale, y_mean, y_scale)
+
+    @classmethod
+    def from_npz(cls, data: bytes) -> "DenseNetwork":
+        """Load a network from the npz archive of the inference_data column written before the artifact format."""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            activations = [str(activation) for activation in arrays["activations"]]
+            return cls(
+                [arrays[f"kernel_{i}"] for i in range(len(activations))],
+                [arrays[f"bias_{i}"] for i in range(len(activations))],
+                activations,
+                arrays["x_mean"],
+                arrays["x_scale"],
+                arrays["y_mean"],
+                arrays["y_scale"]
+            )
+
+    @property
+    def architecture(self) -> Tuple:
+        """The layer shapes and activations. Networks with the same architecture can be evaluated together."""
+        return (self.x_mean.shape, tuple(kernel.shape for kernel in self.kernels), tuple(self.activations))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the unscaled targets of the unscaled feature rows of X."""
+        outputs = (np.asarray(X, dtype=np.float64) - self.x_mean) / self.x_scale
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            outputs = ACTIVATIONS[activation](outputs @ kernel + bias)
+        return outputs[:, 0] * self.y_scale[0] + self.y_mean[0]
+
+def predict_batched(networks: List[DenseNetwork], inputs: np.ndarray) -> np.ndarray:
+    """
+    Predict one target per network, network i is applied to row i of inputs.
+    Networks that share an architecture are stacked and evaluated in one batched forward pass per group.
+    """
+    predictions = np.empty(len(networks), dtype=np.float64)
+    groups: Dict[Tuple, List[int]] = defaultdict(list)
+    for position, network in enumerate(networks):
+        groups[network.architecture].append(position)
+
+    for architecture, positions in groups.items():
+        started = time.perf_counter()
+        members = [networks[position] for position in positions]
+
+        # (group, 1, features) rows so each row is multiplied with the stacked kernel of its own network
+        outputs = np.asarray(inputs[positions], dtype=np.float64)[:, None, :]
+        outputs = (outputs - np.stack([n.x_mean for n in members])[:, None, :]) / np.stack([n.x_scale for n in members])[:, None, :]
+        for layer, activation in enumerate(members[0].activations):
+            kernels = np.stack([n.kernels[layer] for n in members])
+            biases = np.stack([n.biases[layer] for n in members])[:, None, :]
+            outputs = ACTIVATIONS[activation](outputs @ kernels + biases)
+
+        y_scale = np.array([n.y_scale[0] for n in members])
+        y_mean = np.array([n.y_mean[0] for n in members])
+        predictions[positions] = outputs[:, 0, 0] * y_scale + y_mean
+
+        logger.info(
+            "Predicted %d queries with layers %s in %.3f ms",
+            len(positions), list(architecture[1]), (time.perf_counter() - started) * 1000
+        )
+    return predictions
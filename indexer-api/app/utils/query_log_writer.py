@@ -0,0 +1,135 @@
+import io
+import time
+import logging
+from typing import TYPE_CHECKING, List, Optional
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.query_log import QueryLog
+from app.config.settings import settings
+
+# pandas is imported on the first write, so importing the API does not load it
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_BATCH_SIZE = settings.QUERY_LOG_BATCH_SIZE
+
+# Leading timestamp of a log line. The time zone suffix is dropped since time_stamp is stored without a time zone.
+TIMESTAMP_PATTERN = r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?)"
+
+QUERY_LOG_COLUMNS = "tc_query_id, time_stamp, optimized, source_file, source_offset, calls"
+
+# COPY cannot skip conflicting rows, so the rows are copied into a staging table and moved with ON CONFLICT DO NOTHING
+CREATE_STAGING_TABLE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS query_logs_staging (
+        tc_query_id INTEGER,
+        time_stamp TIMESTAMP,
+        optimized BOOLEAN,
+        source_file VARCHAR,
+        source_offset BIGINT,
+        calls BIGINT
+    ) ON COMMIT DELETE ROWS
+"""
+COPY_STAGING_SQL = f"COPY query_logs_staging ({QUERY_LOG_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+MERGE_STAGING_SQL = f"""
+    INSERT INTO query_logs ({QUERY_LOG_COLUMNS})
+    SELECT {QUERY_LOG_COLUMNS} FROM query_logs_staging
+    ON CONFLICT DO NOTHING
+"""
+TRUNCATE_STAGING_SQL = "TRUNCATE query_logs_staging"
+
+def parse_timestamps(timestamps: List[str]) -> "pd.Series":
+    """
+    Parse the raw log timestamps in one vectorized pass.
+    Timestamps that cannot be parsed become NaT.
+    """
+    import pandas as pd
+
+    raw = pd.Series(timestamps, dtype="string")
+    return pd.to_datetime(raw.str.extract(TIMESTAMP_PATTERN, expand=False), format="ISO8601", errors="coerce")
+
+def copy_batch(cursor, batch: "pd.DataFrame") -> int:
+    """
+    Stream a batch of rows into query_logs through COPY and the staging table.
+    Returns the number of inserted rows, rows that already exist are skipped.
+    """
+    buffer = io.StringIO()
+    batch.to_csv(buffer, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+    buffer.seek(0)
+    cursor.copy_expert(COPY_STAGING_SQL, buffer)
+    cursor.execute(MERGE_STAGING_SQL)
+    inserted = cursor.rowcount
+    cursor.execute(TRUNCATE_STAGING_SQL)
+    return inserted
+
+def bulk_insert_query_logs(
+    db: Session,
+    tc_query_ids: List[int],
+    timestamps: List[str],
+    source_files: Optional[List[str]] = None,
+    source_offsets: Optional[List[int]] = None,
+    calls: Optional[List[int]] = None,
+    batch_size: int = QUERY_LOG_BATCH_SIZE
+) -> int:
+    """
+    Insert query logs in batches of batch_size rows without going through the ORM unit of work.
+    Rows are streamed with COPY when the driver supports it, otherwise they are written with executemany.
+    Rows whose (tc_query_id, time_stamp, source_file, source_offset) already exist are skipped, so re-ingesting
+    the same log position is a cheap conflict check. calls is the number of executions of every row, 1 by default.
+    The rows are written on the connection of the session, so they are committed together with the session.
+    Returns the number of inserted rows.
+    """
+    if not tc_query_ids:
+        return 0
+
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        "tc_query_id": tc_query_ids,
+        "time_stamp": parse_timestamps(timestamps),
+        "optimized": "f",
+        "source_file": source_files if source_files is not None else None,
+        "source_offset": pd.array(source_offsets if source_offsets is not None else [None] * len(tc_query_ids), dtype="Int64"),
+        "calls": calls if calls is not None else 1,
+    })
+    skipped = int(frame["time_stamp"].isna().sum())
+    if skipped:
+        logger.warning("Skipping %d query logs with unparsable timestamps", skipped)
+        frame = frame.dropna(subset=["time_stamp"])
+
+    started = time.perf_counter()
+    inserted = 0
+    dbapi_connection = db.connection().connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    try:
+        use_copy = hasattr(cursor, "copy_expert")
+        if use_copy:
+            cursor.execute(CREATE_STAGING_TABLE_SQL)
+        for start in range(0, len(frame), batch_size):
+            batch = frame.iloc[start:start + batch_size]
+            if use_copy:
+                inserted += copy_batch(cursor, batch)
+            else:
+                result = db.execute(insert(QueryLog).on_conflict_do_nothing(), [
+                    {
+                        "tc_query_id": int(row.tc_query_id),
+                        "time_stamp": row.time_stamp.to_pydatetime(),
+                        "optimized": False,
+                        "source_file": row.source_file,
+                        "source_offset": None if pd.isna(row.source_offset) else int(row.source_offset),
+                        "calls": int(row.calls),
+                    }
+                    for row in batch.itertuples(index=False)
+                ])
+                inserted += max(result.rowcount, 0)
+    finally:
+        cursor.close()
+
+    elapsed = time.perf_counter() - started
+    rows_per_second = len(frame) / elapsed if elapsed > 0 else float(len(frame))
+    logger.info(
+        "Wrote %d query logs in %.3f s (%.0f rows/s), %d new and %d already ingested",
+        len(frame), elapsed, rows_per_second, inserted, len(frame) - inserted
+    )
+    return inserted
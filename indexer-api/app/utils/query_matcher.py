@@ -0,0 +1,180 @@
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event
+from app.models.tc_query import TCQuery
+
+# Length of the character shingles the MinHash signatures are built from
+SHINGLE_SIZE = 3
+# Number of MinHash permutations, split into LSH bands of BAND_ROWS rows each.
+# Two queries with a shingle Jaccard similarity of s collide in at least one of the 42 bands of 3 rows with
+# probability 1 - (1 - s^3)^42: 50% at s ~0.25, 68% at 0.3 and over 99% from 0.5. This keeps the recall high
+# for queries that pass the SequenceMatcher threshold.
+NUM_PERMUTATIONS = 126
+BAND_ROWS = 3
+# Mersenne prime used for the universal hash functions. The coefficients stay below 2^31, so
+# a * shingle + b never overflows uint64 for 32 bit shingle hashes.
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_COEFFICIENT = 1 << 31
+
+# Statements of pgAdmin, the catalogs and transaction control that never are time consuming queries.
+# The statement patterns are anchored, so e.g. an UPDATE ... SET is not excluded.
+EXCLUDE_PATTERNS = [
+    r'/\*pga4dash\*/',
+    r'^/pga4dash/$',
+    r'pg_catalog',
+    r'pg_attribute',
+    r'pg_type',
+    r'pg_class',
+    r'pg_namespace',
+    r'attrelid=',
+    r'pg_depend',
+    r'pg_index',
+    r'pg_description',
+    r"^SELECT at\..*",
+    r"^SELECT n\..*",
+    r"^SELECT nsp\..*",
+    r"^SELECT rel\..*",
+    r"^SELECT CASE\..*",
+    r"^SELECT version\(\)",
+    r"^SET .*",
+    r"^COMMIT",
+    r"^BEGIN"
+]
+# All exclude patterns as one regex, so a log query is checked with a single search
+EXCLUDE_PATTERN = re.compile("|".join(f"(?:{pattern})" for pattern in EXCLUDE_PATTERNS), re.IGNORECASE)
+
+PLACEHOLDER = "$VAL$"
+# A literal is a string (with '' escapes), a number or a positional param
+LITERAL = r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\$\d+"
+# The tokens normalize_query rewrites, matched in one scan. An IN list of literals comes first so it is collapsed
+# as a whole, comments are consumed together with the surrounding whitespace.
+NORMALIZE_PATTERN = re.compile(
+    rf"(?P<in_list>\bin\s*\(\s*(?:{LITERAL})(?:\s*,\s*(?:{LITERAL}))*\s*\))"
+    rf"|(?P<literal>{LITERAL})"
+    r"|(?P<gap>(?:\s|--[^\n]*|/\*.*?\*/)+)",
+    re.DOTALL
+)
+NORMALIZED_TOKENS = {"in_list": f"in ({PLACEHOLDER})", "literal": PLACEHOLDER, "gap": " "}
+
+# Number of TC query fingerprints kept in memory
+TC_FINGERPRINT_CACHE_SIZE = 4096
+
+def is_excluded(query: str) -> bool:
+    """Return True if the query is an internal statement that is never matched."""
+    return EXCLUDE_PATTERN.search(query.strip()) is not None
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize SQL queries by:
+    - Lowercasing
+    - Replacing literals and positional params with a generic placeholder
+    - Collapsing IN lists of literals to a single placeholder
+    - Removing comments and extra whitespace
+    """
+    return NORMALIZE_PATTERN.sub(lambda token: NORMALIZED_TOKENS[token.lastgroup], query.lower()).strip()
+
+@lru_cache(maxsize=TC_FINGERPRINT_CACHE_SIZE)
+def tc_fingerprint(query: str) -> str:
+    """Normalize a time consuming query. The fingerprints are cached until a TCQuery row changes."""
+    return normalize_query(query)
+
+@event.listens_for(TCQuery, "after_insert")
+@event.listens_for(TCQuery, "after_update")
+@event.listens_for(TCQuery, "after_delete")
+def invalidate_tc_fingerprints(mapper, connection, target) -> None:
+    """Drop the cached fingerprints when a time consuming query is added, changed or removed."""
+    tc_fingerprint.cache_clear()
+
+class QueryMatcher:
+    """
+    Matches log queries against the time consuming queries.
+    The matcher is built once per ingestion batch. Normalized TC query fingerprints are kept in a dict for O(1)
+    exact hits and in a MinHash LSH index, so a fuzzy match only runs SequenceMatcher against a handful of candidates.
+    """
+
+    def __init__(self, tc_queries: Iterable[Tuple[int, str]], threshold: float = 0.9) -> None:
+        self.threshold = threshold
+        self.exact: Dict[str, int] = {}
+        self.fingerprints: List[Tuple[int, str]] = []
+        self.buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self.cache: Dict[str, Optional[int]] = {}
+
+        generator = np.random.default_rng(seed=1)
+        self.a = generator.integers(1, MAX_COEFFICIENT, size=NUM_PERMUTATIONS, dtype=np.uint64)
+        self.b = generator.integers(0, MAX_COEFFICIENT, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+        for tc_query_id, query in tc_queries:
+            fingerprint = tc_fingerprint(query)
+            # Keep the first TC query for a fingerprint, the same one the linear scan would have picked
+            if fingerprint in self.exact:
+                continue
+            self.exact[fingerprint] = tc_query_id
+            position = len(self.fingerprints)
+            self.fingerprints.append((tc_query_id, fingerprint))
+            for band_key in self.band_keys(fingerprint):
+                self.buckets[band_key].append(position)
+
+    def shingles(self, fingerprint: str) -> Set[int]:
+        """Hash the character shingles of a fingerprint to 32 bit integers."""
+        if len(fingerprint) <= SHINGLE_SIZE:
+            return {zlib.crc32(fingerprint.encode())}
+        return {
+            zlib.crc32(fingerprint[i:i + SHINGLE_SIZE].encode())
+            for i in range(len(fingerprint) - SHINGLE_SIZE + 1)
+        }
+
+    def signature(self, fingerprint: str) -> np.ndarray:
+        """Compute the MinHash signature of a fingerprint."""
+        shingles = np.fromiter(self.shingles(fingerprint), dtype=np.uint64)
+        # (a * x + b) mod p for every permutation and shingle at once
+        hashes = (np.outer(self.a, shingles) + self.b[:, None]) % MERSENNE_PRIME
+        return hashes.min(axis=1)
+
+    def band_keys(self, fingerprint: str) -> List[Tuple[int, bytes]]:
+        """Split the signature of a fingerprint into LSH band keys."""
+        signature = self.signature(fingerprint)
+        return [
+            (band, signature[band * BAND_ROWS:(band + 1) * BAND_ROWS].tobytes())
+            for band in range(NUM_PERMUTATIONS // BAND_ROWS)
+        ]
+
+    def match(self, log_query: str) -> Optional[int]:
+        """Return the id of the TC query that matches the log query, or None if there is no match."""
+        if is_excluded(log_query):
+            return None
+
+        fingerprint = normalize_query(log_query)
+        if fingerprint in self.cache:
+            return self.cache[fingerprint]
+
+        tc_query_id = self.exact.get(fingerprint)
+        if tc_query_id is None:
+            tc_query_id = self.fuzzy_match(fingerprint)
+
+        self.cache[fingerprint] = tc_query_id
+        return tc_query_id
+
+    def fuzzy_match(self, fingerprint: str) -> Optional[int]:
+        """Compare the fingerprint with the LSH candidates and return the most similar one above the threshold."""
+        candidates: Set[int] = set()
+        for band_key in self.band_keys(fingerprint):
+            candidates.update(self.buckets.get(band_key, ()))
+
+        best_id, best_ratio = None, 0.0
+        # Visit the candidates in TC query order so ties resolve like the linear scan
+        for position in sorted(candidates):
+            tc_query_id, tc_fingerprint = self.fingerprints[position]
+            required_ratio = max(self.threshold, best_ratio)
+            matcher = SequenceMatcher(None, fingerprint, tc_fingerprint)
+            # The quick ratios are upper bounds of ratio(), so they reject most candidates cheaply
+            if matcher.real_quick_ratio() < required_ratio or matcher.quick_ratio() < required_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= required_ratio and ratio > best_ratio:
+                best_id, best_ratio = tc_query_id, ratio
+        return best_id
@@ -0,0 +1,76 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session, defer
+from app.models.query_log import QueryLog
+from app.models.trained_models import TrainedModel
+from app.utils.window_dataset import assemble_inputs, timestamp_features
+
+# The best model of every query, the newest one wins a tie
+BEST_MODEL_IDS_SQL = """
+    SELECT DISTINCT ON (tc_query_id) id
+    FROM trained_models
+    WHERE tc_query_id = ANY(:tc_query_ids)
+    ORDER BY tc_query_id, r2_percentage DESC, created_at DESC
+"""
+
+def fetch_recent_executions(db: Session, tc_query_ids: List[int], window_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fetch the last window_size + 1 executions of every given query in one window function query.
+    Returns the ids of the queries that have a full window, and per query (one row each, oldest first)
+    the QueryLog ids and the timestamps as datetime64[us].
+    """
+    window = window_size + 1
+    if not tc_query_ids:
+        return np.empty(0, dtype=np.int64), np.empty((0, window), dtype=np.int64), np.empty((0, window), dtype="datetime64[us]")
+
+    ranked = select(
+        QueryLog.id,
+        QueryLog.tc_query_id,
+        QueryLog.time_stamp,
+        func.row_number().over(
+            partition_by=QueryLog.tc_query_id,
+            order_by=QueryLog.time_stamp.desc()
+        ).label("row_number")
+    ).where(QueryLog.tc_query_id.in_(tc_query_ids)).subquery()
+
+    rows = db.execute(
+        select(ranked.c.id, ranked.c.tc_query_id, ranked.c.time_stamp)
+        .where(ranked.c.row_number <= window)
+        .order_by(ranked.c.tc_query_id, ranked.c.time_stamp)
+    ).all()
+
+    log_ids = np.array([row.id for row in rows], dtype=np.int64)
+    query_ids = np.array([row.tc_query_id for row in rows], dtype=np.int64)
+    timestamps = np.array([row.time_stamp for row in rows], dtype="datetime64[us]")
+
+    # The rows are grouped by query, keep the queries with enough executions to fill a window
+    unique_ids, counts = np.unique(query_ids, return_counts=True)
+    full = np.repeat(counts == window, counts)
+    return (
+        unique_ids[counts == window],
+        log_ids[full].reshape(-1, window),
+        timestamps[full].reshape(-1, window)
+    )
+
+def fetch_best_models(db: Session, tc_query_ids: List[int]) -> Dict[int, TrainedModel]:
+    """
+    Fetch the model with the highest r2_percentage of every given query in one DISTINCT ON query.
+    The pickled scalers are deferred, they are only loaded for models the migration couldn't convert.
+    """
+    if not tc_query_ids:
+        return {}
+    best_ids = text(BEST_MODEL_IDS_SQL).bindparams(tc_query_ids=tc_query_ids).columns(TrainedModel.id)
+    models = db.query(TrainedModel).options(
+        defer(TrainedModel.scaler_x),
+        defer(TrainedModel.scaler_y)
+    ).filter(TrainedModel.id.in_(best_ids)).all()
+    return {model.tc_query_id: model for model in models}
+
+def build_input_vectors(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Build the model inputs from windows of execution timestamps (one window per row, oldest first):
+    the inter-arrival deltas in seconds followed by the cyclic hour and weekday features of the last execution.
+    """
+    deltas = np.diff(timestamps, axis=1) / np.timedelta64(1, "s")
+    return assemble_inputs(deltas, timestamp_features(timestamps[:, -1]))
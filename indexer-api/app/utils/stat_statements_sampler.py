@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.tc_query import TCQuery
+from app.models.statement_counter import StatementCounter
+from app.utils.query_log_writer import bulk_insert_query_logs
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# source_file prefix of the query logs derived from pg_stat_statements, the queryid is appended to it
+STAT_SOURCE_PREFIX = "pg_stat_statements:"
+STAT_MAX_LOGS_PER_SAMPLE = settings.STAT_MAX_LOGS_PER_SAMPLE
+
+# Calls counters of the statements of the tracked queries. A statement can appear once per user and database,
+# so the counters are summed per queryid. LOCALTIMESTAMP is the sample time in the time zone the logs are written in.
+SAMPLE_CALLS_SQL = """
+    SELECT queryid, btrim(query) AS query, SUM(calls)::bigint AS calls, LOCALTIMESTAMP AS sampled_at
+    FROM pg_stat_statements
+    WHERE btrim(query) = ANY(:queries)
+    GROUP BY queryid, btrim(query)
+"""
+
+def spread_calls(start: datetime, end: datetime, count: int, max_rows: int = STAT_MAX_LOGS_PER_SAMPLE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spread count executions evenly over the (start, end] interval as at most max_rows rows.
+    Returns the datetime64[us] timestamps of the rows and the calls of every row, which add up to count.
+    The sampler only knows how many executions happened in the interval, so the timestamps have interval resolution.
+    """
+    rows = min(count, max_rows)
+    calls = np.full(rows, count // rows, dtype=np.int64)
+    calls[:count % rows] += 1
+    start_time = np.datetime64(start, "us")
+    timestamps = start_time + (np.datetime64(end, "us") - start_time) * np.arange(1, rows + 1) // rows
+    return timestamps, calls
+
+def sample_stat_statements(db_org: Session, db_b_plus: Session) -> int:
+    """
+    Turn the pg_stat_statements calls deltas of the time consuming queries into query logs.
+    The first sample of a statement only records its counter. A counter that went backwards (pg_stat_statements_reset
+    or a restart) counts all of its calls since the reset.
+    Returns the number of inserted query logs.
+    """
+    tc_queries: Dict[str, int] = {}
+    for tc_query_id, query in db_b_plus.query(TCQuery.id, TCQuery.query).order_by(TCQuery.id).all():
+        tc_queries.setdefault(query.strip(), tc_query_id)
+    if not tc_queries:
+        return 0
+
+    samples = db_org.execute(text(SAMPLE_CALLS_SQL), {"queries": list(tc_queries)}).fetchall()
+    db_org.rollback()
+
+    counters: Dict[Tuple[int, int], StatementCounter] = {
+        (counter.tc_query_id, counter.queryid): counter
+        for counter in db_b_plus.query(StatementCounter).all()
+    }
+
+    tc_query_ids, timestamps, source_files, source_offsets, calls = [], [], [], [], []
+    for sample in samples:
+        tc_query_id = tc_queries[sample.query]
+        counter = counters.get((tc_query_id, sample.queryid))
+        if counter is None:
+            db_b_plus.add(StatementCounter(
+                tc_query_id=tc_query_id,
+                queryid=sample.queryid,
+                calls=sample.calls,
+                sampled_at=sample.sampled_at
+            ))
+            continue
+
+        previous_calls = counter.calls if sample.calls >= counter.calls else 0
+        delta = sample.calls - previous_calls
+        if delta > 0:
+            row_timestamps, row_calls = spread_calls(counter.sampled_at, sample.sampled_at, delta)
+            tc_query_ids.extend([tc_query_id] * len(row_calls))
+            timestamps.extend(np.char.replace(np.datetime_as_string(row_timestamps, unit="us"), "T", " ").tolist())
+            source_files.extend([f"{STAT_SOURCE_PREFIX}{sample.queryid}"] * len(row_calls))
+            # The running calls count at the last execution of a row identifies it, so a repeated sample inserts nothing
+            source_offsets.extend((previous_calls + np.cumsum(row_calls)).tolist())
+            calls.extend(row_calls.tolist())
+
+        counter.calls = sample.calls
+        counter.sampled_at = sample.sampled_at
+
+    inserted = bulk_insert_query_logs(db_b_plus, tc_query_ids, timestamps, source_files, source_offsets, calls)
+    db_b_plus.commit()
+    logger.info("Sampled %d statements from pg_stat_statements, %d new query logs", len(samples), inserted)
+    return inserted
@@ -0,0 +1,45 @@
+import numpy as np
+from typing import Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+
+# The cyclic hour and weekday features that follow the deltas of a window
+TIME_FEATURE_COUNT = 4
+
+def cyclic_features(hour: np.ndarray, weekday: np.ndarray) -> np.ndarray:
+    """Encode hours (0-23) and weekdays (0-6, Monday first) as sine and cosine pairs, one row per value."""
+    features = np.empty((len(hour), TIME_FEATURE_COUNT))
+    hour_angle = 2 * np.pi * np.asarray(hour, dtype=np.float64) / 24
+    weekday_angle = 2 * np.pi * np.asarray(weekday, dtype=np.float64) / 7
+    np.sin(hour_angle, out=features[:, 0])
+    np.cos(hour_angle, out=features[:, 1])
+    np.sin(weekday_angle, out=features[:, 2])
+    np.cos(weekday_angle, out=features[:, 3])
+    return features
+
+def timestamp_features(timestamps: np.ndarray) -> np.ndarray:
+    """The cyclic features of datetime64 timestamps."""
+    hour = timestamps.astype("datetime64[h]").astype(np.int64) % 24
+    # 1970-01-01 was a Thursday, weekday 3 with Monday as 0
+    weekday = (timestamps.astype("datetime64[D]").astype(np.int64) + 3) % 7
+    return cyclic_features(hour, weekday)
+
+def assemble_inputs(windows: np.ndarray, features: np.ndarray) -> np.ndarray:
+    """Write the windows of deltas and the features of the execution that follows each window into one matrix."""
+    inputs = np.empty((windows.shape[0], windows.shape[1] + TIME_FEATURE_COUNT))
+    inputs[:, :windows.shape[1]] = windows
+    inputs[:, windows.shape[1]:] = features
+    return inputs
+
+def create_dataset(deltas: np.ndarray, features: np.ndarray, window_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the training set of a series of inter-arrival deltas and the cyclic features of the same executions.
+    Every row of X is a window of window_size deltas followed by the features of the next execution,
+    whose delta is the target. The windows are strided views of the deltas, only X itself is allocated.
+    """
+    deltas = np.asarray(deltas, dtype=np.float64)
+    rows = len(deltas) - window_size
+    if rows <= 0:
+        return np.empty((0, window_size + TIME_FEATURE_COUNT)), np.empty(0)
+
+    windows = sliding_window_view(deltas[:-1], window_size)
+    return assemble_inputs(windows, features[window_size:]), deltas[window_size:]
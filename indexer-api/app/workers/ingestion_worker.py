@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from sqlalchemy import text
+from app.config.settings import settings
+from app.database.session import OrgSessionLocal, BPlusSessionLocal, b_plus_engine
+from app.controllers.adim_controller import run_ingestion_pass
+
+logger = logging.getLogger(__name__)
+
+# The sampler polls pg_stat_statements at its own interval, which sets the resolution of the sampled timestamps
+INGESTION_INTERVAL_SECONDS = (
+    settings.STAT_SAMPLING_INTERVAL_SECONDS
+    if settings.WORKLOAD_CAPTURE_MODE == "pg_stat_statements"
+    else settings.INGESTION_INTERVAL_SECONDS
+)
+SCHEDULING_INTERVAL_SECONDS = settings.SCHEDULING_INTERVAL_SECONDS
+LOG_PARSER_WORKERS = settings.LOG_PARSER_WORKERS
+
+# Key of the PostgreSQL advisory lock that lets only one worker ingest at a time (e.g. with several API workers)
+INGESTION_LOCK_KEY = 7_340_001
+
+def create_parser_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Create the process pool that parses the log chunks, None if they are parsed inline.
+    The worker keeps the pool across passes, its processes are started on the first chunk.
+    """
+    if settings.WORKLOAD_CAPTURE_MODE == "pg_stat_statements" or LOG_PARSER_WORKERS <= 1:
+        return None
+    # The passes run in a thread of the API process, forking it would copy its threads' locks
+    return ProcessPoolExecutor(max_workers=LOG_PARSER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def ingest_once(schedule: bool, executor: Optional[ProcessPoolExecutor] = None) -> bool:
+    """
+    Run one ingestion pass with fresh database sessions, parsing the log chunks in the given process pool.
+    Returns False if another worker holds the ingestion lock and the pass was skipped.
+    """
+    with b_plus_engine.connect() as lock_connection:
+        locked = lock_connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": INGESTION_LOCK_KEY}).scalar()
+        lock_connection.commit()
+        if not locked:
+            return False
+        try:
+            db_org = OrgSessionLocal()
+            db_b_plus = BPlusSessionLocal()
+            try:
+                run_ingestion_pass(db_org, db_b_plus, schedule=schedule, executor=executor)
+            finally:
+                db_org.close()
+                db_b_plus.close()
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INGESTION_LOCK_KEY})
+            lock_connection.commit()
+    return True
+
+async def run_ingestion_worker(stop_event: asyncio.Event) -> None:
+    """
+    Capture the workload of the organization database continuously until the stop event is set.
+    The passes are blocking, so they run in a thread and never hold up the event loop of the API.
+    """
+    last_scheduled = None
+    executor = create_parser_pool()
+    try:
+        while not stop_event.is_set():
+            schedule = last_scheduled is None or time.monotonic() - last_scheduled >= SCHEDULING_INTERVAL_SECONDS
+            try:
+                ran = await asyncio.to_thread(ingest_once, schedule, executor)
+                if ran and schedule:
+                    last_scheduled = time.monotonic()
+            except BrokenProcessPool:
+                # A parser process died, replace the pool for the next pass
+                logger.exception("Log parser pool failed, restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = create_parser_pool()
+            except Exception:
+                logger.exception("Log ingestion pass failed")
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=INGESTION_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+if __name__ == "__main__":
+    # Run the worker as a separate process: python -m app.workers.ingestion_worker
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run_ingestion_worker(asyncio.Event()))
+    except KeyboardInterrupt:
+        pass
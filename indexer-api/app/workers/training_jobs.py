@@ -0,0 +1,311 @@
+import io
+import uuid
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from app.config.settings import settings
+from app.schemas.model_trainer import TrainingJobStatusResponse
+
+logger = logging.getLogger(__name__)
+
+TRAINING_MAX_CONCURRENT_JOBS = settings.TRAINING_MAX_CONCURRENT_JOBS
+TRAINING_MAX_QUEUED_JOBS = settings.TRAINING_MAX_QUEUED_JOBS
+TRAINING_JOB_HISTORY_SIZE = settings.TRAINING_JOB_HISTORY_SIZE
+
+class TrainingCancelled(Exception):
+    """Raised in a worker process when its job was cancelled."""
+
+class TrainingJob:
+    """The state of a training job, kept in the API process."""
+
+    def __init__(self, job_id: str, kind: str, query_id: int, epochs: int) -> None:
+        self.job_id = job_id
+        # "training" or "search"
+        self.kind = kind
+        self.query_id = query_id
+        self.epochs = epochs
+        self.status = "queued"
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[Dict[str, Any]] = None
+        # The last progress published by the worker, copied here when the job finishes
+        self.progress: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+def report_progress(progress: Any, cancelled: Any, job_id: str) -> Callable[[int, Dict[str, float]], None]:
+    """
+    Return the epoch callback of a job. It publishes the progress to the API process and stops the training
+    at the end of the epoch if the job was cancelled.
+    """
+    def on_epoch_end(epoch: int, logs: Dict[str, float]) -> None:
+        progress[job_id] = {
+            "status": "running",
+            "started_at": progress.get(job_id, {}).get("started_at"),
+            "epoch": epoch + 1,
+            "loss": float(logs["loss"]) if "loss" in logs else None,
+            "val_loss": float(logs["val_loss"]) if "val_loss" in logs else None
+        }
+        if job_id in cancelled:
+            raise TrainingCancelled()
+    return on_epoch_end
+
+def run_training_job(job_id: str, progress: Any, cancelled: Any, training_data: Optional[bytes], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Train a model in a worker process. Runs with its own database session, TensorFlow is only ever imported here.
+    Returns the RMSE and R² of the stored model.
+    """
+    from tensorflow.keras.callbacks import LambdaCallback
+    from app.database.session import BPlusSessionLocal
+    from app.controllers.model_trainer_controller import train_model
+
+    if job_id in cancelled:
+        raise TrainingCancelled()
+    progress[job_id] = {"status": "running", "started_at": datetime.now(), "epoch": 0, "loss": None, "val_loss": None}
+
+    db = BPlusSessionLocal()
+    try:
+        response = train_model(
+            db=db,
+            training_data=io.BytesIO(training_data) if training_data is not None else None,
+            callbacks=[LambdaCallback(on_epoch_end=report_progress(progress, cancelled, job_id))],
+            **parameters
+        )
+    except HTTPException as e:
+        # Exceptions travel back pickled, which doesn't work for HTTPException
+        raise RuntimeError(e.detail) from None
+    finally:
+        db.close()
+    return response.model_dump()
+
+def run_search_job(job_id: str, progress: Any, cancelled: Any, training_data: Optional[bytes], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a hyperparameter search in a worker process. The training data is read and preprocessed once, the trials
+    run in their own pool of processes, and only the model of the best trial is stored.
+    Returns the RMSE and R² of the stored model and the leaderboard of the best trials.
+    """
+    from app.database.session import BPlusSessionLocal
+    from app.controllers.model_trainer_controller import load_training_dataset, pre_processing, model_definition, store_model_in_db
+    from app.utils.hyperparameter_search import TrialResult, leaderboard, run_search, search_space
+
+    if job_id in cancelled:
+        raise TrainingCancelled()
+    progress[job_id] = {"status": "running", "started_at": datetime.now(), "trials_finished": 0}
+
+    def on_trial(finished: int, total: int, result: TrialResult) -> None:
+        best = progress.get(job_id, {}).get("val_loss")
+        progress[job_id] = {
+            **progress.get(job_id, {}),
+            "trials_finished": finished,
+            "trials": total,
+            "val_loss": result.val_loss if best is None else min(best, result.val_loss)
+        }
+
+    db = BPlusSessionLocal()
+    try:
+        X_raw, y_raw = load_training_dataset(
+            db,
+            parameters["query_id"],
+            io.BytesIO(training_data) if training_data is not None else None
+        )
+        X_scaled, y_scaled, scaler_x, scaler_y = pre_processing(X_raw, y_raw)
+
+        results = run_search(
+            X_scaled,
+            y_scaled,
+            parameters["strategy"],
+            search_space(parameters["number_of_hidden_layers"], parameters["number_of_neurons_per_layer"], parameters["batch_size"]),
+            parameters["max_trials"],
+            parameters["epochs"],
+            parameters["early_stopping_patience"],
+            parameters["validation_split"],
+            cancelled,
+            job_id,
+            on_trial,
+            seed=parameters.get("seed")
+        )
+
+        # Rebuild the model of the best trial from its weights instead of training it again
+        best = min(results, key=lambda result: result.val_loss)
+        model = model_definition(best.config.number_of_hidden_layers, best.config.number_of_neurons_per_layer, X_scaled)
+        model.set_weights(best.weights)
+        trials = leaderboard(results)
+        store_model_in_db(
+            db,
+            parameters["query_id"],
+            model,
+            best.config.number_of_hidden_layers,
+            best.config.number_of_neurons_per_layer,
+            parameters["early_stopping_patience"],
+            best.epochs,
+            best.config.batch_size,
+            parameters["validation_split"],
+            scaler_x,
+            scaler_y,
+            best.rmse,
+            best.r2_percentage,
+            trial_leaderboard=trials
+        )
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from None
+    finally:
+        db.close()
+    return {"rmse": best.rmse, "r2_score": best.r2_percentage, "leaderboard": trials}
+
+class TrainingJobManager:
+    """
+    Runs model trainings in a bounded pool of worker processes, so a training never blocks the event loop
+    and at most TRAINING_MAX_CONCURRENT_JOBS run at once. Further jobs wait in the pool's queue.
+    The workers publish their progress through a multiprocessing manager, running jobs are cancelled at the end
+    of their current epoch. A hyperparameter search occupies one worker and trains its trials in a pool of its own.
+    Jobs live in the memory of the API process, they are lost on restart.
+    """
+
+    def __init__(self, max_workers: int = TRAINING_MAX_CONCURRENT_JOBS) -> None:
+        self.max_workers = max_workers
+        self.jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.manager = None
+        self.progress = None
+        self.cancelled = None
+
+    def start(self) -> None:
+        """
+        Start the manager process and the worker pool. The API starts them in its lifespan, starting the manager
+        takes a while and would stall the event loop if it happened in the first training request.
+        """
+        if self.executor is not None:
+            return
+        # Forking a process that runs threads is unsafe (and TensorFlow doesn't survive it), start fresh interpreters
+        context = multiprocessing.get_context("spawn")
+        self.manager = context.Manager()
+        self.progress = self.manager.dict()
+        self.cancelled = self.manager.dict()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def submit(self, kind: str, target: Callable[..., Dict[str, Any]], training_data: Optional[bytes], parameters: Dict[str, Any]) -> TrainingJob:
+        """
+        Queue a job that runs target(job_id, progress, cancelled, training_data, parameters) in a worker.
+        Raises an HTTPException if the queue is full.
+        """
+        with self.lock:
+            # The jobs that are not finished occupy the workers first, the rest wait
+            unfinished = sum(1 for job in self.jobs.values() if job.finished_at is None)
+            if unfinished >= self.max_workers + TRAINING_MAX_QUEUED_JOBS:
+                raise HTTPException(status_code=429, detail="Too many training jobs are queued, try again later.")
+            # Only starts anything when the manager was used without the API lifespan
+            self.start()
+
+            job = TrainingJob(uuid.uuid4().hex, kind, parameters["query_id"], parameters["epochs"])
+            self.jobs[job.job_id] = job
+            self.trim_history()
+            job.future = self.executor.submit(target, job.job_id, self.progress, self.cancelled, training_data, parameters)
+        job.future.add_done_callback(lambda future: self.finish(job, future))
+        return job
+
+    def finish(self, job: TrainingJob, future: Future) -> None:
+        """Record the outcome of a job."""
+        with self.lock:
+            job.finished_at = datetime.now()
+            if future.cancelled():
+                job.status = "cancelled"
+            elif isinstance(future.exception(), TrainingCancelled):
+                job.status = "cancelled"
+            elif future.exception() is not None:
+                job.status = "failed"
+                job.error = str(future.exception())
+                logger.error("Training job %s of query %d failed: %s", job.job_id, job.query_id, job.error)
+            else:
+                job.status = "succeeded"
+                job.result = future.result()
+
+            # The final state is kept here, the shared entries are only needed while the job runs
+            if self.progress is not None:
+                try:
+                    job.progress = dict(self.progress.pop(job.job_id, {}))
+                    self.cancelled.pop(job.job_id, None)
+                except (EOFError, OSError):
+                    # The manager is gone during shutdown
+                    pass
+
+    def trim_history(self) -> None:
+        """Forget the oldest finished jobs beyond the history size."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - TRAINING_JOB_HISTORY_SIZE)]:
+            del self.jobs[job_id]
+
+    def cancel(self, job_id: str) -> TrainingJobStatusResponse:
+        """Cancel a queued or running job. A running job stops at the end of its current epoch."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Training job not found.")
+            if job.finished_at is not None:
+                raise HTTPException(status_code=409, detail=f"Training job already {job.status}.")
+            self.cancelled[job_id] = True
+        # A job that hasn't started is removed from the queue right away, the done callback marks it cancelled
+        job.future.cancel()
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> TrainingJobStatusResponse:
+        """Return the status of a job."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Training job not found.")
+            return self.describe(job)
+
+    def list_jobs(self) -> List[TrainingJobStatusResponse]:
+        """Return the status of every known job, the latest first."""
+        with self.lock:
+            return [self.describe(job) for job in reversed(self.jobs.values())]
+
+    def describe(self, job: TrainingJob) -> TrainingJobStatusResponse:
+        """Combine the job state with the progress published by its worker."""
+        result = job.result or {}
+        progress = job.progress
+        if progress is None:
+            progress = dict(self.progress.get(job.job_id, {})) if self.progress is not None else {}
+
+        status = job.status
+        if status == "queued" and progress.get("status") == "running":
+            status = "cancelling" if job.job_id in self.cancelled else "running"
+
+        return TrainingJobStatusResponse(
+            job_id=job.job_id,
+            kind=job.kind,
+            query_id=job.query_id,
+            status=status,
+            epoch=progress.get("epoch", 0),
+            epochs=job.epochs,
+            loss=progress.get("loss"),
+            val_loss=progress.get("val_loss"),
+            rmse=result.get("rmse"),
+            r2_score=result.get("r2_score"),
+            trials_finished=progress.get("trials_finished"),
+            trials=progress.get("trials"),
+            leaderboard=result.get("leaderboard"),
+            error=job.error,
+            created_at=job.created_at,
+            started_at=progress.get("started_at"),
+            finished_at=job.finished_at
+        )
+
+    def shutdown(self) -> None:
+        """Stop the pool. Queued jobs are dropped and running ones are cancelled at the end of their epoch."""
+        if self.executor is None:
+            return
+        with self.lock:
+            for job in self.jobs.values():
+                if job.finished_at is None:
+                    self.cancelled[job.job_id] = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.manager.shutdown()
+
+training_jobs = TrainingJobManager()
@@ -0,0 +1,57 @@
+"""
+Benchmark of the stderr, csvlog and jsonlog log parsers.
+
+Generates the same synthetic workload in the three PostgreSQL log formats and times the parsing of it.
+Run from the indexer-api directory:
+
+    python -m benchmarks.log_parser_benchmark --statements 200000
+"""
+import io
+import csv
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from app.utils.log_parser import parse_log_chunk
+
+QUERY = "SELECT *\n  FROM operation_bulletin\n  WHERE item_code = 'ITEM-{i}'"
+
+def generate_logs(statements: int) -> dict:
+    """Generate the synthetic log content of every format."""
+    stderr_lines, json_lines = [], []
+    csv_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_buffer, lineterminator="\n")
+    start = datetime(2025, 1, 1)
+    for i in range(statements):
+        timestamp = (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S.123 +0530")
+        query = QUERY.format(i=i)
+        stderr_lines.append(f"{timestamp} [42] LOG:  statement: {query}\n")
+        csv_writer.writerow([timestamp, "postgres", "org", 42, "[local]", "abc.42", i, "SELECT", timestamp,
+                             "3/0", 0, "LOG", "00000", f"statement: {query}", "", "", "", "", "", "", "", "", "psql",
+                             "client backend", "", 0])
+        json_lines.append(json.dumps({"timestamp": timestamp, "user": "postgres", "dbname": "org", "pid": 42,
+                                      "error_severity": "LOG", "message": f"statement: {query}"}) + "\n")
+    return {
+        "stderr": "".join(stderr_lines).encode(),
+        "csvlog": csv_buffer.getvalue().encode(),
+        "jsonlog": "".join(json_lines).encode(),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--statements", type=int, default=100000, help="Number of logged statements")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    for log_format, content in generate_logs(args.statements).items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            entries = parse_log_chunk(content, log_format)
+            best = min(best, time.perf_counter() - started)
+        assert len(entries) == args.statements, f"{log_format} parsed {len(entries)} statements"
+        size = len(content) / 2**20
+        print(f"{log_format:8} {size:8.1f} MiB {best:8.3f} s {size / best:8.1f} MiB/s {args.statements / best:12.0f} statements/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of the sliding window dataset builder against the former per-row loop.
+
+Generates a synthetic execution history, builds the training set of it with both implementations,
+checks that they produce the same X and y and times them.
+Run from the indexer-api directory:
+
+    python -m benchmarks.window_dataset_benchmark --executions 500000
+"""
+import time
+import argparse
+import numpy as np
+from app.utils.window_dataset import create_dataset, timestamp_features
+
+def create_dataset_loop(deltas, sin_hour, cos_hour, sin_weekday, cos_weekday, window_size):
+    """The former builder: one np.hstack per row over Python lists."""
+    X, y = [], []
+    for i in range(len(deltas) - window_size):
+        window = deltas[i:i + window_size]
+        extra_features = [
+            sin_hour[i + window_size],
+            cos_hour[i + window_size],
+            sin_weekday[i + window_size],
+            cos_weekday[i + window_size]
+        ]
+        X.append(np.hstack((window, extra_features)))
+        y.append(deltas[i + window_size])
+    return np.array(X), np.array(y)
+
+def generate_history(executions: int) -> tuple:
+    """Generate the deltas and time features of executions every 15 minutes with some jitter."""
+    rng = np.random.default_rng(42)
+    seconds = np.cumsum(900 + rng.integers(-120, 120, executions))
+    timestamps = np.datetime64("2025-01-01T00:00:00", "s") + seconds.astype("timedelta64[s]")
+    deltas = np.empty(executions)
+    deltas[0] = np.nan
+    deltas[1:] = np.diff(timestamps) / np.timedelta64(1, "s")
+    # The first execution has no delta, the training data drops it
+    return deltas[1:], timestamp_features(timestamps)[1:]
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--executions", type=int, default=200000, help="Number of executions in the history")
+    parser.add_argument("--window-size", type=int, default=10, help="Number of deltas per window")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    deltas, features = generate_history(args.executions)
+
+    def run_loop():
+        return create_dataset_loop(deltas.tolist(), *(features[:, column].tolist() for column in range(4)), args.window_size)
+
+    def run_vectorized():
+        return create_dataset(deltas, features, args.window_size)
+
+    X_loop, y_loop = run_loop()
+    X_vectorized, y_vectorized = run_vectorized()
+    assert np.array_equal(X_loop, X_vectorized) and np.array_equal(y_loop, y_vectorized), "The builders disagree"
+
+    loop = best_time(run_loop, args.repeat)
+    vectorized = best_time(run_vectorized, args.repeat)
+    rows = len(y_vectorized)
+    print(f"{'loop':12} {loop:8.3f} s {rows / loop:14.0f} rows/s")
+    print(f"{'vectorized':12} {vectorized:8.3f} s {rows / vectorized:14.0f} rows/s {loop / vectorized:8.1f}x")
+
+if __name__ == "__main__":
+    main()
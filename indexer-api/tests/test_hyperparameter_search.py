@@ -0,0 +1,14 @@
+import pytest
+from app.utils.hyperparameter_search import SUCCESSIVE_HALVING_ETA, halving_rounds
+
+@pytest.mark.parametrize("power", range(1, 7))
+def test_halving_rounds_of_exact_powers(power):
+    configs = SUCCESSIVE_HALVING_ETA ** power
+    rounds = halving_rounds(configs, SUCCESSIVE_HALVING_ETA ** power)
+    # Every round keeps 1/ETA of the configurations and the last one trains a single one with the full epochs
+    assert [round_configs for round_configs, _ in rounds] == [SUCCESSIVE_HALVING_ETA ** (power - n) for n in range(power + 1)]
+    assert [round_epochs for _, round_epochs in rounds] == [SUCCESSIVE_HALVING_ETA ** n for n in range(power + 1)]
+
+def test_halving_rounds_below_eta():
+    assert halving_rounds(1, 10) == [(1, 10)]
+    assert halving_rounds(SUCCESSIVE_HALVING_ETA - 1, 10) == [(SUCCESSIVE_HALVING_ETA - 1, 10)]
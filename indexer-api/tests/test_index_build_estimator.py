@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from app.utils.index_build_estimator import (
+    DEFAULT_COLUMN_WIDTH, IndexBuildEstimator, TABLE_STATS_SQL, parse_index_definition
+)
+
+class FakeOrgSession:
+    """Answers the table statistics queries of the estimator and records their parameters."""
+
+    def __init__(self, widths):
+        self.widths = widths
+        self.params = []
+
+    def execute(self, statement, params):
+        self.params.append(params)
+        if str(statement) == TABLE_STATS_SQL:
+            row = SimpleNamespace(relpages=10, reltuples=1000.0, schema_name="Sales", relation_name="orders")
+            return SimpleNamespace(fetchone=lambda: row)
+        return SimpleNamespace(fetchall=lambda: [SimpleNamespace(attname=name, avg_width=width) for name, width in self.widths.items()])
+
+    def rollback(self):
+        pass
+
+def test_parse_index_definition_splits_quoted_qualified_names():
+    definition = parse_index_definition('CREATE INDEX idx ON "Sales"."My.Orders" (a)')
+    assert definition.table_name == "Sales.My.Orders"
+    assert definition.quoted_table_name == '"Sales"."My.Orders"'
+    assert parse_index_definition("create index idx on Public.Orders (a)").table_name == "public.orders"
+
+def test_build_stats_folds_column_names_and_filters_by_schema():
+    db_org = FakeOrgSession({"orderdate": 8, "CustomerId": 4, "note text": 20})
+    stats = IndexBuildEstimator(db_org, None).build_stats(
+        'CREATE INDEX idx ON "Sales".orders (OrderDate DESC, "CustomerId", "note text", lower(name))'
+    )
+    assert stats.key_width == 8 + 4 + 20 + DEFAULT_COLUMN_WIDTH
+    assert db_org.params == [{"table_name": '"Sales"."orders"'}, {"schema_name": "Sales", "table_name": "orders"}]
@@ -0,0 +1,118 @@
+import os
+import multiprocessing
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from app.database.base import Base
+from app.models.log_file_checkpoint import LogFileCheckpoint
+from app.models.ingestion_batch import IngestionBatch
+from app.controllers import adim_controller
+from app.utils import log_volume
+
+LOG_FILENAME = "postgresql-2025-01-01.log"
+
+def statement_lines(timestamps):
+    return "".join(f"2025-01-01 {timestamp}.000 +0000 [42] LOG:  statement: SELECT * FROM orders\n" for timestamp in timestamps)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[LogFileCheckpoint.__table__, IngestionBatch.__table__])
+    with Session(engine) as session:
+        yield session
+
+@pytest.fixture
+def inserted(monkeypatch, tmp_path):
+    """Ingest from a log directory in tmp_path and collect the inserted entries instead of writing query logs."""
+    entries = []
+    monkeypatch.setattr(log_volume, "LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(adim_controller, "get_log_volume", log_volume.FileSystemLogVolume)
+    monkeypatch.setattr(adim_controller, "LOG_FORMAT", "stderr")
+    monkeypatch.setattr(adim_controller, "build_query_matcher", lambda db: None)
+    monkeypatch.setattr(adim_controller, "insert_query_logs", lambda db, user_entries, commit, matcher: entries.extend(user_entries))
+    return entries
+
+@pytest.fixture(params=[1, 2], ids=["inline", "pool"])
+def executor(request, monkeypatch):
+    """Parse inline or in a spawned pool that is kept across passes, like the ingestion worker does."""
+    monkeypatch.setattr(adim_controller, "LOG_PARSER_WORKERS", request.param)
+    if request.param == 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=request.param, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield pool
+
+def test_truncated_log_file_is_ingested_again(db, inserted, executor, tmp_path):
+    # The last entry of the current log file may still be written to, it is ingested once the next one starts
+    path = tmp_path / LOG_FILENAME
+    path.write_text(statement_lines(["10:00:00", "10:01:00", "10:02:00", "10:03:00", "10:04:00"]))
+    adim_controller.ingest_pending_logs(db, executor)
+    assert [entry["timestamp"][:19] for entry in inserted] == [f"2025-01-01 10:0{minute}:00" for minute in range(4)]
+
+    # Truncate and rewrite the file in place, so it keeps its inode but is shorter than the checkpoint
+    inode = os.stat(path).st_ino
+    with open(path, "r+") as f:
+        f.truncate(0)
+        f.write(statement_lines(["11:00:00", "11:01:00", "11:02:00"]))
+    assert os.stat(path).st_ino == inode
+    inserted.clear()
+
+    adim_controller.ingest_pending_logs(db, executor)
+    assert [entry["timestamp"][:19] for entry in inserted] == ["2025-01-01 11:00:00", "2025-01-01 11:01:00"]
+    # Only the ledger of the new content is left
+    ingested = len(statement_lines(["11:00:00", "11:01:00"]))
+    assert db.query(LogFileCheckpoint).one().byte_offset == ingested
+    assert [(batch.start_offset, batch.end_offset) for batch in db.query(IngestionBatch).all()] == [(0, ingested)]
+
+def test_appended_entries_resume_from_the_checkpoint(db, inserted, executor, tmp_path):
+    path = tmp_path / LOG_FILENAME
+    path.write_text(statement_lines(["10:00:00", "10:01:00", "10:02:00"]))
+    adim_controller.ingest_pending_logs(db, executor)
+    assert len(inserted) == 2
+    inserted.clear()
+
+    # Only the held back entry and the new complete one are ingested
+    with open(path, "a") as f:
+        f.write(statement_lines(["10:03:00", "10:04:00"]))
+    adim_controller.ingest_pending_logs(db, executor)
+    assert [entry["timestamp"][:19] for entry in inserted] == ["2025-01-01 10:02:00", "2025-01-01 10:03:00"]
+    assert db.query(LogFileCheckpoint).one().byte_offset == len(statement_lines(["10:00:00", "10:01:00", "10:02:00", "10:03:00"]))
+
+def test_rotated_log_file_is_consumed_and_deleted(db, inserted, executor, tmp_path):
+    path = tmp_path / LOG_FILENAME
+    path.write_text(statement_lines(["10:00:00", "10:01:00"]))
+    adim_controller.ingest_pending_logs(db, executor)
+    inserted.clear()
+
+    # A newer log file rotates the old one, so its last entry is complete
+    newer = tmp_path / "postgresql-2025-01-02.log"
+    newer.write_text(statement_lines(["12:00:00", "12:01:00"]))
+    adim_controller.ingest_pending_logs(db, executor)
+    assert sorted(entry["timestamp"][:19] for entry in inserted) == ["2025-01-01 10:01:00", "2025-01-01 12:00:00"]
+
+    # The old file, its checkpoint and its ledger batches are gone
+    assert not path.exists()
+    assert [checkpoint.filename for checkpoint in db.query(LogFileCheckpoint).all()] == [newer.name]
+    assert {batch.source_file for batch in db.query(IngestionBatch).all()} == {newer.name}
+
+def test_replaced_log_file_is_ingested_from_the_start(db, inserted, executor, tmp_path):
+    path = tmp_path / LOG_FILENAME
+    path.write_text(statement_lines(["10:00:00", "10:01:00", "10:02:00"]))
+    adim_controller.ingest_pending_logs(db, executor)
+    inserted.clear()
+
+    # Replace the file with a longer one under a new inode, so the checkpoint offset is still within the file.
+    # The old file is kept open until the new one exists so the inode can't be reused.
+    replacement = tmp_path / "replacement.tmp"
+    replacement.write_text(statement_lines(["11:00:00", "11:01:00", "11:02:00", "11:03:00"]))
+    with open(path):
+        os.replace(replacement, path)
+    adim_controller.ingest_pending_logs(db, executor)
+    assert [entry["timestamp"][:19] for entry in inserted] == ["2025-01-01 11:00:00", "2025-01-01 11:01:00", "2025-01-01 11:02:00"]
+
+    checkpoint = db.query(LogFileCheckpoint).one()
+    ingested = len(statement_lines(["11:00:00", "11:01:00", "11:02:00"]))
+    assert (checkpoint.inode, checkpoint.byte_offset) == (os.stat(path).st_ino, ingested)
+    assert [(batch.start_offset, batch.end_offset) for batch in db.query(IngestionBatch).all()] == [(0, ingested)]
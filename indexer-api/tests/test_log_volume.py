@@ -0,0 +1,43 @@
+import subprocess
+import pytest
+from app.utils import log_volume
+
+@pytest.fixture
+def volume(monkeypatch, tmp_path):
+    """A DockerLogVolume whose scripts run in a local shell on tmp_path instead of a container."""
+    processes = []
+
+    class RecordingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            processes.append(self)
+
+    monkeypatch.setattr(log_volume.subprocess, "Popen", RecordingPopen)
+    monkeypatch.setattr(
+        log_volume.DockerLogVolume,
+        "container_command",
+        lambda self, script: ["sh", "-c", script.replace("cd /logs", f"cd {tmp_path}", 1)]
+    )
+    (tmp_path / "a.log").write_bytes(b"0123456789")
+    (tmp_path / "b c.log").write_bytes(b"abcdefghij")
+    volume = log_volume.DockerLogVolume()
+    volume.processes = processes
+    return volume
+
+def test_open_log_files_streams_the_ranges(volume):
+    read = {}
+    for filename, stream in volume.open_log_files([("a.log", 2, 8), ("missing.log", 0, 5), ("b c.log", 5, 10)]):
+        # Leave part of the first range unread, the next range must still start at its own bytes
+        read[filename] = stream.read(3) if filename == "a.log" else stream.read()
+    assert read == {"a.log": b"234", "missing.log": b"", "b c.log": b"fghij"}
+    assert volume.processes[0].returncode == 0
+
+def test_open_log_files_clamps_to_the_current_size(volume):
+    # The file is shorter than when it was listed
+    assert [(filename, stream.read()) for filename, stream in volume.open_log_files([("a.log", 4, 50)])] == [("a.log", b"456789")]
+
+def test_closing_early_stops_and_reaps_the_container(volume):
+    files = volume.open_log_files([("a.log", 0, 10), ("b c.log", 0, 10)])
+    next(files)
+    files.close()
+    assert volume.processes[0].returncode is not None
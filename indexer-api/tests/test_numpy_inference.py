@@ -0,0 +1,78 @@
+import io
+import json
+import zlib
+import numpy as np
+import pytest
+from app.utils.numpy_inference import ARTIFACT_MAGIC, ARTIFACT_PREFIX, DenseNetwork, is_artifact, predict_batched
+
+FEATURES = 14
+
+def make_network(seed, hidden=8):
+    generator = np.random.default_rng(seed)
+    return DenseNetwork(
+        [generator.standard_normal((FEATURES, hidden)).astype(np.float32), generator.standard_normal((hidden, 1)).astype(np.float32)],
+        [generator.standard_normal(hidden).astype(np.float32), generator.standard_normal(1).astype(np.float32)],
+        ["relu", "linear"],
+        generator.standard_normal(FEATURES),
+        generator.random(FEATURES) + 0.5,
+        np.array([300.0]),
+        np.array([50.0])
+    )
+
+@pytest.fixture
+def inputs():
+    return np.random.default_rng(0).standard_normal((5, FEATURES))
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_artifact_round_trip(inputs, compress):
+    network = make_network(1)
+    data = network.to_bytes(compress=compress)
+    assert is_artifact(data)
+
+    loaded = DenseNetwork.from_bytes(data)
+    assert loaded.activations == network.activations
+    for original, restored in zip(network.kernels + network.biases, loaded.kernels + loaded.biases):
+        assert restored.dtype == np.float32 and np.array_equal(original, restored)
+    assert np.array_equal(loaded.x_mean, network.x_mean) and np.array_equal(loaded.y_scale, network.y_scale)
+    np.testing.assert_allclose(loaded.predict(inputs), network.predict(inputs))
+
+def test_uncompressed_artifact_loads_as_views_of_the_stored_bytes():
+    data = make_network(2).to_bytes()
+    loaded = DenseNetwork.from_bytes(data)
+    stored = np.frombuffer(data, dtype=np.uint8)
+    for array in [loaded.x_mean, loaded.y_scale] + loaded.kernels + loaded.biases:
+        assert np.shares_memory(array, stored)
+        assert array.flags.aligned
+
+def test_version_1_artifacts_still_load(inputs):
+    network = make_network(3)
+    header = json.dumps({"features": FEATURES, "layers": [[FEATURES, 8], [8, 1]], "activations": network.activations}).encode()
+    payload = np.concatenate([
+        np.ravel(array).astype("<f8") for array in
+        [network.x_mean, network.x_scale, network.y_mean, network.y_scale, network.kernels[0], network.biases[0], network.kernels[1], network.biases[1]]
+    ]).tobytes()
+    for flags, body in [(0, payload), (1, zlib.compress(payload))]:
+        data = ARTIFACT_PREFIX.pack(ARTIFACT_MAGIC, 1, flags, len(header)) + header + body
+        np.testing.assert_allclose(DenseNetwork.from_bytes(data).predict(inputs), network.predict(inputs))
+
+def test_npz_inference_data_still_loads(inputs):
+    network = make_network(4)
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        activations=np.array(network.activations),
+        kernel_0=network.kernels[0], bias_0=network.biases[0], kernel_1=network.kernels[1], bias_1=network.biases[1],
+        x_mean=network.x_mean, x_scale=network.x_scale, y_mean=network.y_mean, y_scale=network.y_scale
+    )
+    np.testing.assert_allclose(DenseNetwork.from_bytes(buffer.getvalue()).predict(inputs), network.predict(inputs))
+
+def test_truncated_artifact_is_rejected():
+    data = make_network(5).to_bytes()
+    with pytest.raises(ValueError):
+        DenseNetwork.from_bytes(data[:-4])
+
+def test_predict_batched_matches_the_single_predictions(inputs):
+    # Two architectures, so the networks are evaluated in two stacked groups
+    networks = [make_network(6), make_network(7, hidden=4), make_network(8), make_network(9, hidden=4), make_network(10)]
+    expected = [network.predict(inputs[position:position + 1])[0] for position, network in enumerate(networks)]
+    np.testing.assert_allclose(predict_batched(networks, inputs), expected)
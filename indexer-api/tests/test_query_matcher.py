@@ -0,0 +1,65 @@
+import random
+from difflib import SequenceMatcher
+import pytest
+from app.utils.query_matcher import QueryMatcher, is_excluded, normalize_query
+
+TC_QUERIES = [
+    (1, "SELECT * FROM orders WHERE customer_id = 42"),
+    (2, "SELECT o.id, o.total FROM orders o JOIN customers c ON c.id = o.customer_id WHERE c.region = 'EU' ORDER BY o.total DESC"),
+    (3, "SELECT * FROM operation_bulletin WHERE item_code = 'ITEM-102'"),
+    (4, "UPDATE inventory SET quantity = quantity - 1 WHERE item_id = 7"),
+    (5, "SELECT count(*) FROM shipments WHERE status IN ('open', 'late') AND created_at > '2025-01-01'"),
+    # Same fingerprint as the first query, the first TC query wins
+    (6, "select *   from orders where customer_id = 99"),
+]
+
+def brute_force_match(log_query, threshold=0.9):
+    """The linear scan the matcher replaces: the most similar fingerprint above the threshold, the first on ties."""
+    if is_excluded(log_query):
+        return None
+    fingerprint = normalize_query(log_query)
+    best_id, best_ratio = None, 0.0
+    seen = set()
+    for tc_query_id, query in TC_QUERIES:
+        tc_fingerprint = normalize_query(query)
+        if tc_fingerprint in seen:
+            continue
+        seen.add(tc_fingerprint)
+        ratio = SequenceMatcher(None, fingerprint, tc_fingerprint).ratio()
+        if ratio >= threshold and ratio > best_ratio:
+            best_id, best_ratio = tc_query_id, ratio
+    return best_id
+
+def log_variants():
+    """Log queries that differ from the TC queries in literals, layout, comments and small edits."""
+    generator = random.Random(7)
+    variants = [
+        "SELECT * FROM orders WHERE customer_id = 1234",
+        "select *\n  from orders\n where customer_id = $1 -- from the app",
+        "SELECT o.id, o.total FROM orders o JOIN customers c ON c.id = o.customer_id WHERE c.region = 'US' ORDER BY o.total DESC",
+        "SELECT o.id, o.total FROM orders o JOIN customers c ON c.id = o.customer_id WHERE c.region = 'US' ORDER BY o.total ASC",
+        "SELECT * FROM operation_bulletin WHERE item_code = 'ITEM-7' /* report */",
+        "SELECT count(*) FROM shipments WHERE status IN ('open', 'late', 'lost') AND created_at > '2024-06-01'",
+        "SELECT count(*) FROM shipments WHERE status = 'open'",
+        "DELETE FROM orders WHERE customer_id = 42",
+        "SELECT version()",
+        "BEGIN",
+    ]
+    for _, query in TC_QUERIES:
+        # Drop a random character, like a slightly different statement of the same query
+        position = generator.randrange(len(query))
+        variants.append(query[:position] + query[position + 1:])
+    return variants
+
+@pytest.mark.parametrize("log_query", log_variants())
+def test_matcher_agrees_with_the_linear_scan(log_query):
+    assert QueryMatcher(TC_QUERIES).match(log_query) == brute_force_match(log_query)
+
+def test_matcher_matches_exact_fingerprints_and_excludes_internal_statements():
+    matcher = QueryMatcher(TC_QUERIES)
+    assert matcher.match("SELECT * FROM orders WHERE customer_id = 7") == 1
+    assert matcher.match("UPDATE inventory SET quantity = quantity - 5 WHERE item_id = 9") == 4
+    assert matcher.match("SELECT * FROM pg_catalog.pg_class") is None
+    # Results are cached per fingerprint, excluded statements are rejected before
+    assert matcher.match("select * from orders where customer_id = 8") == 1
+    assert len(matcher.cache) == 2
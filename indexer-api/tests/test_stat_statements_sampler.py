@@ -0,0 +1,17 @@
+from datetime import datetime
+import numpy as np
+from app.utils.stat_statements_sampler import spread_calls
+
+START = datetime(2025, 1, 1, 10, 0)
+END = datetime(2025, 1, 1, 10, 1)
+
+def test_spread_calls_writes_one_row_per_call_below_the_cap():
+    timestamps, calls = spread_calls(START, END, 3, max_rows=10)
+    assert timestamps.tolist() == [datetime(2025, 1, 1, 10, 0, 20), datetime(2025, 1, 1, 10, 0, 40), END]
+    assert calls.tolist() == [1, 1, 1]
+
+def test_spread_calls_caps_the_rows_and_keeps_the_calls():
+    timestamps, calls = spread_calls(START, END, 1_000_003, max_rows=1000)
+    assert len(timestamps) == len(calls) == 1000
+    assert calls.sum() == 1_000_003 and calls.max() - calls.min() <= 1
+    assert timestamps[-1] == np.datetime64(END) and np.all(np.diff(timestamps) > np.timedelta64(0))
@@ -1,36 +1,23 @@
-import os
 import sys
-import requests
-from dotenv import load_dotenv
-from schemas import WorkLoadSimulatorRequest, LoginRequest, LoginResponse
-
-load_dotenv()
-
-END_POINT = os.getenv("END_POINT")
-USER_NAME = os.getenv("USER_NAME")
-PASSWORD = os.getenv("PASSWORD")
-
-def get_access_token() -> str:
-    response = requests.post(
-        f"{END_POINT}/dba/login",
-        json=LoginRequest(username=USER_NAME, password=PASSWORD).model_dump()
-    )
-    response.raise_for_status()
-    return LoginResponse(**response.json()).access_token
+from typing import List
+from indexer_api_client import get_client
+from schemas import WorkLoadSimulatorRequest
 
 def execute_query(sql_query: str):
-    access_token = get_access_token()
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(
-        f"{END_POINT}/workload-simulation",
-        json=WorkLoadSimulatorRequest(sql_query=sql_query).model_dump(),
-        headers=headers
+    response = get_client().post(
+        "/workload-simulation",
+        json=WorkLoadSimulatorRequest(sql_query=sql_query).model_dump()
     )
     response.raise_for_status()
     print(f"Query executed successfully")
 
+def execute_queries(sql_queries: List[str]):
+    # The queries share the connection and the access token of the client
+    for sql_query in sql_queries:
+        execute_query(sql_query)
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("sql_query argument is missing")
         sys.exit(1)
-    execute_query(sys.argv[1])
\ No newline at end of file
+    execute_queries(sys.argv[1:])